@@ -1,9 +1,22 @@
 
+import math
+import uuid
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from data_loader import MEMORY_REPORT, dataset_source, key_dictionary_bytes
+from charts import histogram_figure, line_figure, pie_figure, scatter_figure
+from explorer import TableIndex
+from indexes import AccountIndex, PhaseIndex
+from playbooks import PLAYBOOKS, playbook_bytes, playbook_contexts, render_playbook
+from rollups import filtered_rollups
+from snapshot import SnapshotStore
+from telemetry import (LOG_PATH, cache_stats, finish_render, percentiles, record_miss, record_payload, span,
+                       start_render, table_payload_bytes, tracked)
+
 # --- CONFIGURATION & PAGE STYLE ---
 st.set_page_config(page_title="Product Zero | Sales Strategy", layout="wide", initial_sidebar_state="expanded")
 
@@ -16,34 +29,193 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    # 1. Main Strategy Workbook
-    strategy_file = 'Mock-productzero-sheet 2.xlsx'
-    overview = pd.read_excel(strategy_file, sheet_name='Executive_Overview')
-    actions = pd.read_excel(strategy_file, sheet_name='Account_Action_List')
-    logic = pd.read_excel(strategy_file, sheet_name='ROI_Logic_Explained')
-    summary = pd.read_excel(strategy_file, sheet_name='Phase_Summary')
-    
-    # 2. Coverage Workbook (Mock day1-2)
-    #canonical_df = 'canonical_dataset.xlsx'
-    coverage_file = 'mock_day1-2_account_coverage.xlsx'
-    #canonical_df = pd.read_csv('canonical_dataset.xlsx - Sheet1.csv')
-    #canonical_df['order_date'] = pd.to_datetime(canonical_df['order_date']) # Ensure dates are usable
-    # Reading from sheet 'in' as per your file name
-    coverage = pd.read_excel(coverage_file, sheet_name='in')
-    
-    # 3. Generated Leakage Files (CSVs)
-    leakage = pd.read_csv('revenue_leakage_detector.csv')
-    next_call = pd.read_csv('next_best_call_list.csv')
-   
-    return overview, actions, logic, summary, coverage, leakage, next_call
-
-try:
-    overview_df, action_df, logic_df, summary_df, coverage_df, leakage_df, next_call_df = load_data()
-except Exception as e:
-    st.error(f"Error loading files. Ensure filenames match exactly on GitHub. Error: {e}")
-    st.stop()
+# One snapshot store per process: a background thread rebuilds whatever sources changed and
+# swaps the new version in, so every session reads the same frames and none waits on a refresh
+@st.cache_resource
+def data_store():
+    return SnapshotStore().start()
+
+# Surface a missing or unreadable source file on the page instead of a traceback
+def load_or_stop(loader):
+    try:
+        return loader()
+    except Exception as e:
+        st.error(f"Error loading files. Ensure filenames match exactly on GitHub. Error: {e}")
+        st.stop()
+
+# A session stays on the snapshot version it started with until it asks for the latest
+# (or its version is evicted), so paging through a table never mixes two versions
+def session_snapshot():
+    with span('snapshot'):
+        snapshot = load_or_stop(lambda: data_store().get(st.session_state.get('snapshot_version')))
+    st.session_state['snapshot_version'] = snapshot.version
+    return snapshot
+
+# Pages only ask for the datasets they render; each is built on the snapshot's first request for it
+def get_dataset(name):
+    return load_or_stop(lambda: snapshot[name])
+
+# Lookup indexes for the paged tables, shared read-only across sessions
+@tracked('canonical_index')
+@st.cache_resource(max_entries=2)
+def load_canonical_index(version):
+    record_miss('canonical_index')
+    with span('aggregate'):
+        return TableIndex(get_dataset('orders'), keys=('category', 'rep_role', 'account_name'), date_column='order_date')
+
+# Chart totals for one set of Canonical Dataset filters; keyed on the filters, so going
+# back to a slice seen before (by any session) is a cache hit
+@tracked('filtered_rollups')
+@st.cache_resource(max_entries=32)
+def load_filtered_rollups(version, date_range, equals):
+    record_miss('filtered_rollups')
+    with span('aggregate'):
+        return filtered_rollups(get_dataset('order_table'), get_dataset('rollups').margin_width, date_range, dict(equals))
+
+@tracked('table_index')
+@st.cache_resource(max_entries=8)
+def table_index(df, keys):
+    record_miss('table_index')
+    with span('aggregate'):
+        return TableIndex(df, keys=keys)
+
+# Action list with ROI Speed Scores recomputed from the order history, unless the
+# spreadsheet values are explicitly requested
+def get_actions():
+    return get_dataset('actions') if use_static_outputs else get_dataset('scored_actions')
+
+# Keyed on the input versions rather than the snapshot number, which restarts with the
+# process: call sheets written to disk by an earlier run must not be served for new scores
+def actions_version():
+    return snapshot.content_version(), use_static_outputs
+
+# Phase-partitioned, score-sorted view of the action list: one immutable index per scores
+# version, shared by every session. A new version is derived from the last index built,
+# so when only a few scores moved just those accounts are re-positioned.
+@st.cache_resource
+def latest_phase_indexes():
+    return {}
+
+@tracked('phase_index')
+@st.cache_resource(max_entries=4)
+def load_phase_index(version):
+    record_miss('phase_index')
+    _, static = version
+    previous = latest_phase_indexes().get(static)
+    with span('aggregate'):
+        if previous is None:
+            index = PhaseIndex(get_actions(), version=version)
+        else:
+            index = previous.with_actions(get_actions(), version)
+    latest_phase_indexes()[static] = index
+    return index
+
+def get_phase_index():
+    return load_phase_index(actions_version())
+
+# customer_id -> rows in every source, for the Account 360 page
+@tracked('account_index')
+@st.cache_resource(max_entries=2)
+def load_account_index(version):
+    record_miss('account_index')
+    leakage, next_call = get_leakage()
+    with span('aggregate'):
+        return AccountIndex({'actions': get_actions(), 'coverage': get_coverage(), 'leakage': leakage,
+                             'next_call': next_call, 'orders': get_dataset('orders')})
+
+def get_account_index():
+    return load_account_index(actions_version())
+
+# Leakage audit and next best call list derived from the orders
+def get_leakage():
+    if use_static_outputs:
+        return get_dataset('leakage'), get_dataset('next_call')
+    return get_dataset('leakage_audit'), get_dataset('next_call_list')
+
+# Coverage audit re-derived from the scored action list and the current rep assignments
+def get_coverage():
+    return get_dataset('coverage') if use_static_outputs else get_dataset('coverage_audit')
+
+# Placeholder values for every Phase 1A/1B account's playbook
+@tracked('playbook_contexts')
+@st.cache_resource(max_entries=2)
+def load_playbook_contexts(version):
+    record_miss('playbook_contexts')
+    with span('aggregate'):
+        orders = get_dataset('playbook_orders')
+        return playbook_contexts(get_actions(), orders, get_leakage()[0])
+
+def get_playbook_contexts():
+    version = actions_version()
+    return load_playbook_contexts(version), version
+
+@tracked('personal_playbook')
+@st.cache_data(max_entries=1000)
+def personal_playbook(customer_id, version):
+    record_miss('personal_playbook')
+    contexts = load_playbook_contexts(version)
+    return render_playbook(contexts[contexts['customer_id'] == customer_id].iloc[0].to_dict())
+
+# Runs only when the download is clicked; the rendered file is reused until the inputs change
+def call_sheets(contexts, version):
+    return playbook_bytes(contexts, version)
+
+# Figures are built once per input version and shared read-only; `_build` only runs on a miss.
+# The serialized size is taken once per build too, so reporting it costs nothing on a hit.
+@tracked('figure')
+@st.cache_resource(max_entries=64)
+def _figure(name, version, _build):
+    record_miss('figure')
+    with span('figure_build'):
+        fig = _build()
+    return fig, len(fig.to_json())
+
+def cached_figure(name, version, _build):
+    fig, payload_bytes = _figure(name, version, _build)
+    record_payload('chart', name, payload_bytes)
+    return fig
+
+# Chart and table payloads are serialized inside the st.* call, so that is what gets timed
+def show_chart(fig):
+    with span('chart_serialize'):
+        st.plotly_chart(fig, use_container_width=True)
+
+def show_table(name, df, **kwargs):
+    record_payload('table', name, table_payload_bytes(df))
+    with span('table_serialize'):
+        st.dataframe(df, use_container_width=True, **kwargs)
+
+# Filter, sort and page on the server; only the visible page is sent to the browser.
+# `where` ({'equals', 'date_range'}) holds filters set elsewhere on the page, which then owns the date filter.
+def paged_table(key, index, columns=None, filters=(), search=None, sort_by=None, page_size=50, where=None):
+    columns = list(columns or index.df.columns)
+    with st.expander("🔎 Filter & Sort"):
+        date_range = None
+        if index.date_column and where is None:
+            first, last = (pd.Timestamp(bound).date() for bound in index.date_bounds())
+            picked = st.date_input("Date range", value=(first, last), min_value=first, max_value=last, key=f"{key}_dates")
+            if len(picked) == 2:
+                date_range = picked
+        filter_cols = st.columns(max(len(filters), 1))
+        equals = {col: filter_cols[i].multiselect(col, index.options(col), key=f"{key}_{col}")
+                  for i, col in enumerate(filters)}
+        text = st.text_input(f"{search} contains", key=f"{key}_search") if search else None
+        sort_col, order_col = st.columns([3, 1])
+        sort_by = sort_col.selectbox("Sort by", columns, index=columns.index(sort_by) if sort_by else 0, key=f"{key}_sort")
+        ascending = order_col.radio("Order", ["Descending", "Ascending"], key=f"{key}_order") == "Ascending"
+
+    if where:
+        equals = {**where.get('equals', {}), **equals}
+        date_range = date_range or where.get('date_range')
+    with span('aggregate'):
+        positions = index.select(equals=equals, search={search: text} if search else None, date_range=date_range)
+    pages = max(1, math.ceil(len(positions) / page_size))
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    with span('aggregate'):
+        rows, total = index.page(positions, sort_by=sort_by, ascending=ascending, page=page, page_size=page_size)
+    show_table(key, rows[columns], hide_index=True)
+    first_row = (page - 1) * page_size
+    st.caption(f"Showing rows {min(first_row + 1, total):,}–{first_row + len(rows):,} of {total:,}")
 
 
 # --- SIDEBAR NAVIGATION ---
@@ -53,15 +225,27 @@ page = st.sidebar.radio("Go to", [
     "Canonical Dataset",
     "Product 0: Phase Deep-Dives",
     "Top 10 Hit List",
+    "Account 360",
     "Product 1: Coverage Analyzer", 
     "Product 2: Leakage Detector", 
     "Product 3: Playbooks",
     "Strategy & ROI Logic",
 ])
+# Every run is timed phase by phase; see the admin panel at the bottom of the sidebar
+start_render(page, st.session_state.setdefault('telemetry_session', uuid.uuid4().hex[:8]))
+use_static_outputs = st.sidebar.toggle("Use precomputed file outputs", value=False,
+                                       help="Show the ROI scores, coverage flags and leakage lists exported to the workbook/CSV files instead of computing them from the canonical orders.")
+
+snapshot = session_snapshot()
+latest = data_store().current()
+if latest.version != snapshot.version and st.sidebar.button(f"🔄 New data available — load v{latest.version}"):
+    st.session_state['snapshot_version'] = latest.version
+    st.rerun()
 
 # --- PAGE 1: EXECUTIVE SUMMARY ---
 if page == "Executive Summary":
     st.title("🚀 Strategy Overview")
+    overview_df, action_df, summary_df = get_dataset('overview'), get_actions(), get_dataset('summary')
     st.markdown("#### *Data-Driven Sales Prioritization Engine*")
     
     # Writeup on the Products
@@ -101,18 +285,21 @@ if page == "Executive Summary":
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("Revenue Potential by Phase")
-        fig_rev = px.bar(summary_df, x='recommended_phase', y='total_revenue', 
+        fig_rev = cached_figure('phase_revenue', snapshot.fingerprint[dataset_source('summary')], lambda: px.bar(
+                         summary_df, x='recommended_phase', y='total_revenue', 
                          color='recommended_phase', text_auto='.2s',
                          labels={'total_revenue': 'Total Revenue ($)', 'recommended_phase': 'Phase'},
-                         color_discrete_sequence=px.colors.qualitative.Prism)
-        st.plotly_chart(fig_rev, use_container_width=True)
+                         color_discrete_sequence=px.colors.qualitative.Prism))
+        show_chart(fig_rev)
         st.caption("**Legend:** Bars show total historical revenue footprint for each phase segment.")
         
     with c2:
         st.subheader("Account Distribution")
-        fig_pie = px.pie(action_df, names='recommended_phase', hole=0.4,
-                         color_discrete_sequence=px.colors.qualitative.Safe)
-        st.plotly_chart(fig_pie, use_container_width=True)
+        # Phase counts are taken on the server rather than shipping one row per account
+        fig_pie = cached_figure('phase_distribution', actions_version(), lambda: pie_figure(
+                         action_df, names='recommended_phase', hole=0.4,
+                         color_discrete_sequence=px.colors.qualitative.Safe))
+        show_chart(fig_pie)
         st.caption("**Legend:** Proportional split of total account count across the four strategic phases.")
 
 # --- NEW PAGE: CANONICAL DATASET ---
@@ -120,47 +307,76 @@ elif page == "Canonical Dataset":
     st.title("🗂️ Canonical Dataset")
     st.markdown("""""")
 
-    # Load Data directly from Excel
-    # Note: Ensure 'openpyxl' is installed in your environment
-    canonical_df = pd.read_excel('canonical_dataset.xlsx')
-    
-    # Ensure date format is correct for time-series analysis
-    canonical_df['order_date'] = pd.to_datetime(canonical_df['order_date'])
+    # Charts read the pre-aggregated rollups, refreshed with only the new orders; the
+    # explorer below is served from the month-partitioned order store
+    orders_version = snapshot.fingerprint['orders']
+    canonical_index = load_canonical_index(orders_version)
+    for drop, reason in get_dataset('rejected_drops').items():
+        st.warning(f"Order drop `{drop}` was not ingested: {reason}")
+
+    # Sidebar filters drive the charts and the explorer. A filtered slice is scanned from the
+    # in-memory Arrow copy of the orders with the filters pushed down; with none set, the
+    # rollups are used as they are.
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🔎 Filter Orders")
+    first, last = (pd.Timestamp(bound).date() for bound in canonical_index.date_bounds())
+    picked = st.sidebar.date_input("Order date", value=(first, last), min_value=first, max_value=last, key="canonical_dates")
+    date_range = tuple(picked) if len(picked) == 2 and tuple(picked) != (first, last) else None
+    categories = st.sidebar.multiselect("Category", canonical_index.options('category'), key="canonical_category")
+    rep_roles = st.sidebar.multiselect("Rep role", canonical_index.options('rep_role'), key="canonical_rep_role")
+    # Accounts are searched on the server: only matches (and accounts already picked) reach the browser
+    account_text = st.sidebar.text_input("Account contains", key="canonical_account_search")
+    picked_accounts = st.session_state.get("canonical_account", [])
+    account_options = list(dict.fromkeys(
+        picked_accounts + (canonical_index.search_options('account_name', account_text) if account_text else [])))
+    accounts = st.sidebar.multiselect("Account", account_options, key="canonical_account",
+                                      placeholder="Search above to list accounts")
+    equals = tuple((col, tuple(values)) for col, values in (
+        ('category', categories), ('rep_role', rep_roles), ('account_name', accounts)) if values)
+    if date_range or equals:
+        rollups = load_filtered_rollups(orders_version, date_range, equals)
+        charts_version = (orders_version, date_range, equals)
+        st.info(f"Showing {rollups.order_count:,} order(s) matching the sidebar filters." if rollups.order_count
+                else "No orders match the sidebar filters.")
+    else:
+        rollups = get_dataset('rollups')
+        charts_version = orders_version
 
     # Visuals Row 1: Segment Breakdown and Time Trends
     c1, c2 = st.columns(2)
     with c1:
         st.subheader("Revenue by Category")
-        cat_rev = canonical_df.groupby('category')['order_value'].sum().reset_index()
-        fig_cat = px.bar(cat_rev, x='category', y='order_value', color='category', 
+        fig_cat = cached_figure('category_revenue', charts_version, lambda: px.bar(
+                         rollups.category_revenue(), x='category', y='order_value', color='category', 
                          text_auto='.2s', title="Spend Distribution by Vertical",
-                         color_discrete_sequence=px.colors.qualitative.Pastel)
-        st.plotly_chart(fig_cat, use_container_width=True)
+                         color_discrete_sequence=px.colors.qualitative.Pastel))
+        show_chart(fig_cat)
     
     with c2:
         st.subheader("Monthly Revenue Trend")
-        # Grouping by Month Start to show continuous velocity
-        trend = canonical_df.resample('MS', on='order_date')['order_value'].sum().reset_index()
-        fig_trend = px.line(trend, x='order_date', y='order_value', markers=True, 
-                            title="Portfolio Sales Velocity")
-        st.plotly_chart(fig_trend, use_container_width=True)
+        # Month Start buckets (empty months read 0) to show continuous velocity; LTTB-downsampled past the point budget
+        fig_trend = cached_figure('monthly_trend', charts_version, lambda: line_figure(
+                            rollups.monthly_revenue(), x='order_date', y='order_value', markers=True, 
+                            title="Portfolio Sales Velocity"))
+        show_chart(fig_trend)
 
     # Visuals Row 2: Profitability and Power Users
     c3, c4 = st.columns(2)
     with c3:
         st.subheader("Order Margin Distribution")
-        fig_margin = px.histogram(canonical_df, x='margin', title="Profitability Spread",
-                                  color_discrete_sequence=['#2ecc71'])
-        st.plotly_chart(fig_margin, use_container_width=True)
+        # Bins are counted in the rollups, so only bin counts reach the browser
+        fig_margin = cached_figure('margin_histogram', charts_version, lambda: histogram_figure(
+                                   rollups.margin_histogram(), 'margin', title="Profitability Spread",
+                                   color_discrete_sequence=['#2ecc71']))
+        show_chart(fig_margin)
         
     with c4:
         st.subheader("Top 10 High-Value Accounts")
-        top_accs = canonical_df.groupby('account_name')['order_value'].sum().nlargest(10).reset_index()
-        fig_top = px.bar(top_accs, x='order_value', y='account_name', orientation='h',
+        fig_top = cached_figure('top_accounts', charts_version, lambda: px.bar(
+                         rollups.top_accounts(10), x='order_value', y='account_name', orientation='h',
                          title="Core Revenue Drivers", color='order_value', 
-                         color_continuous_scale='Viridis')
-        fig_top.update_layout(yaxis={'categoryorder':'total ascending'})
-        st.plotly_chart(fig_top, use_container_width=True)
+                         color_continuous_scale='Viridis').update_layout(yaxis={'categoryorder':'total ascending'}))
+        show_chart(fig_top)
 
     # Data Label Legend
     st.divider()
@@ -172,11 +388,13 @@ elif page == "Canonical Dataset":
 
     # Interactive Data Explorer
     st.subheader("Raw Data Explorer")
-    st.dataframe(canonical_df, use_container_width=True, hide_index=True)
+    paged_table("canonical", canonical_index, search='account_name', sort_by='order_date',
+                where={'equals': dict(equals), 'date_range': date_range})
     
 # --- PAGE 2: PRODUCT 1 (COVERAGE) ---
 elif page == "Product 1: Coverage Analyzer":
     st.title("🎯 Product 1: Account Coverage Gap Analyzer")
+    coverage_df = get_coverage()
     
     st.markdown("""
     **Purpose:** Identify where sales resource allocation is out of sync with account potential.
@@ -217,10 +435,10 @@ elif page == "Product 1: Coverage Analyzer":
 
     # Display Coverage List
     st.subheader("Account Coverage Mapping")
-    # We use the actual dataframe from your mock_day1-2_account_coverage.xlsx
-    st.dataframe(coverage_df[['customer_id', 'recommended_phase', 'roi_speed_score', 'rep_role', 'coverage_flag']], 
-                 use_container_width=True, 
-                 hide_index=True)
+    # Coverage audit (recomputed, or the mock_day1-2_account_coverage.xlsx export)
+    paged_table("coverage", table_index(coverage_df, ('recommended_phase', 'rep_role', 'coverage_flag', 'customer_id')),
+                columns=['customer_id', 'recommended_phase', 'roi_speed_score', 'rep_role', 'coverage_flag'],
+                filters=('recommended_phase', 'rep_role', 'coverage_flag'), search='customer_id', sort_by='roi_speed_score')
     
     st.markdown("""
     **How it's done:** We audit the **ROI Score** against the **Rep Role**. If the potential (ROI) outgrows the resource (Inside), we flag for an upgrade.
@@ -231,22 +449,64 @@ elif page == "Top 10 Hit List":
     st.title("🏆 High-Velocity Top 10")
     st.info("These accounts represent the highest recovery potential. Focus resources here for immediate impact.")
     
-    top_10 = action_df.sort_values(by='roi_speed_score', ascending=False).head(10)
+    top_10 = get_phase_index().top(10)
     
     # Highlight Table
-    st.dataframe(top_10[['account_name', 'roi_speed_score', 'recommended_phase', 'recommended_action', 'primary_reason']], 
-                 use_container_width=True, hide_index=True)
+    show_table('top_10', top_10[['account_name', 'roi_speed_score', 'recommended_phase', 'recommended_action', 'primary_reason']], 
+               hide_index=True)
     
     # Speed Score Chart
-    fig_top = px.bar(top_10, x='roi_speed_score', y='account_name', orientation='h',
+    fig_top = cached_figure('top_10_scores', actions_version(), lambda: px.bar(
+                     top_10, x='roi_speed_score', y='account_name', orientation='h',
                      color='roi_speed_score', color_continuous_scale='Greens',
-                     title="Top 10 Speed Scores (0-100)")
-    fig_top.update_layout(yaxis={'categoryorder':'total ascending'})
-    st.plotly_chart(fig_top, use_container_width=True)
+                     title="Top 10 Speed Scores (0-100)").update_layout(yaxis={'categoryorder':'total ascending'}))
+    show_chart(fig_top)
     
+# --- PAGE: ACCOUNT 360 ---
+elif page == "Account 360":
+    st.title("🔍 Account 360")
+    st.markdown("Phase, score, coverage, leakage and order history for a single account, in one place.")
+
+    account_index = get_account_index()
+    query = st.text_input("Search by customer ID or account name", placeholder="e.g. CUST_020 or Tiger Woods")
+    matches = account_index.search(query) if query else []
+    if not matches:
+        st.info("Type a customer ID or part of an account name to look it up." if not query else "No matching accounts.")
+    else:
+        customer_id = st.selectbox("Account", matches, format_func=account_index.labels.get)
+        account = account_index.lookup(customer_id)
+
+        action_row, coverage_row = account['actions'], account['coverage']
+        leakage_row, orders = account['leakage'], account['orders']
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Phase", action_row['recommended_phase'].iloc[0] if not action_row.empty else 'N/A')
+        m2.metric("ROI Speed Score", int(action_row['roi_speed_score'].iloc[0]) if not action_row.empty else 'N/A')
+        m3.metric("Coverage Flag", coverage_row['coverage_flag'].iloc[0] if not coverage_row.empty else 'N/A')
+        m4.metric("Est. Recoverable Revenue",
+                  f"${leakage_row['est_recoverable_revenue'].iloc[0]:,.0f}" if not leakage_row.empty else '$0')
+
+        if not action_row.empty:
+            st.markdown(f"**Recommended Action:** {action_row['recommended_action'].iloc[0]} — {action_row['primary_reason'].iloc[0]}")
+        if not leakage_row.empty:
+            on_call_list = not account['next_call'].empty
+            st.warning(f"**Leakage:** {leakage_row['reason'].iloc[0]}"
+                       + (" · On the Next Best Call List." if on_call_list else ""))
+
+        st.subheader("Order History")
+        if orders.empty:
+            st.caption("No orders on record.")
+        else:
+            o1, o2, o3 = st.columns(3)
+            o1.metric("Lifetime Revenue", f"${orders['order_value'].sum():,.0f}")
+            o2.metric("Orders", len(orders))
+            o3.metric("Last Order", f"{orders['order_date'].max():%Y-%m-%d}")
+            show_table('account_orders', orders.sort_values('order_date', ascending=False), hide_index=True)
+
 # --- PAGE 3: PRODUCT 2 (LEAKAGE) ---
 elif page == "Product 2: Leakage Detector":
     st.title("📉 Product 2: Revenue Leakage Detector")
+    leakage_df, next_call_df = get_leakage()
     
     st.markdown("""
     **Purpose:** Spotting silent attrition by identifying drops in order frequency before accounts go dormant.
@@ -293,10 +553,11 @@ elif page == "Product 2: Leakage Detector":
         """)
 
     st.subheader("Next Best Call List (Top Recovery Targets)")
-    st.dataframe(next_call_df[['account_name', 'reason', 'est_recoverable_revenue']], use_container_width=True, hide_index=True)
+    show_table('next_call', next_call_df[['account_name', 'reason', 'est_recoverable_revenue']], hide_index=True)
 
     st.subheader("Full Leakage Audit")
-    st.dataframe(leakage_df, use_container_width=True, hide_index=True)
+    paged_table("leakage", table_index(leakage_df, ('leakage_type', 'account_name')),
+                filters=('leakage_type',), search='account_name', sort_by='est_recoverable_revenue')
     
 # --- PAGE 4: PRODUCT 3 (PLAYBOOKS) ---
 # --- PAGE 4: PRODUCT 3 (PLAYBOOKS) ---
@@ -308,68 +569,35 @@ elif page == "Product 3: Playbooks":
         "Playbook: Phase 1B (Dormant/Recovery)", 
         "Product 0: How Data Shapes Execution"
     ])
-    
-    if selection == "Playbook: Phase 1A (Active/No Coverage)":
-        st.subheader("Strategy: The Service Upgrade (Active / No Coverage)")
-        st.info("**Intent:** Transition transactional web-buyers into managed accounts to prevent shopping around.")
-        
-        # 1. Call Opening
-        st.markdown("### 1. Call Opening")
-        st.success("“I’m calling from the Account Strategy team. I was reviewing your account activity—specifically your consistent orders in [Category]—and I realized that despite your volume, you don't currently have a dedicated specialist assigned to you. I’m calling to bridge that gap and ensure you have a direct line for project pricing and inventory flags.”")
-        st.caption("**The Logic:** Links call to actual behavior. Pivots from 'sales' to a 'service upgrade.'")
-
-        # 2. Discovery Questions
-        st.markdown("### 2. Discovery Questions")
-        st.success("“Since you’re currently placing these orders through the portal, what is the one thing about our lead-time communication that slows your team down? Also, who else on your team is authorized to pull technical specs? I want to make sure they have the same direct access I'm providing you.”")
-        st.caption("**The Logic:** Uncovers changes in needs and identifies other stakeholders (Expansion).")
-
-        # 3. Objection Handling
-        st.markdown("### 3. Objection Handling (Pushback: 'We're all set/The website is fine')")
-        st.success("“I’m glad the portal is working well—it’s designed for speed. My goal isn’t to change HOW you buy, but to change WHAT you pay. I can flag volume discounts or stock shortages before you even hit 'checkout' on the site.”")
-        st.caption("**The Logic:** Acknowledge → Reframe. Adds a layer of value the automated system cannot provide.")
-
-        # 4. Cross-Sell Prompt
-        st.markdown("### 4. Cross-Sell Prompt")
-        st.success("“Most clients moving your volume of [Primary Category] are also seeing a 15% savings by bundling their [Adjacent Category] requirements. Would you like a price-comparison on your next bundle?”")
-        st.caption("**The Logic:** Logic-based expansion framed as 'streamlining' efficiency.")
-
-        # 5. Follow-Up Email
-        st.markdown("### 5. Follow-Up Email")
-        st.success("**Subject:** Direct Contact for [Account Name] | Project Pricing\n\n“Great speaking today. I’ve attached my direct line and a summary of the volume pricing tiers for [Category] we talked about. Next time you have a project over $5k, shoot me the SKU list before you buy so I can check for additional savings.”")
-        
-        st.divider()
-        st.markdown("**Note for Reps:** This account is active but undefended. Focus on engagement and consistency.")
-
-    elif selection == "Playbook: Phase 1B (Dormant/Recovery)":
-        st.subheader("Strategy: The Diagnostic Recovery (Dormant / Declined)")
-        st.info("**Intent:** Re-engage historically significant accounts by uncovering the 'Silent No' (the reason they left).")
-
-        # 1. Call Opening
-        st.markdown("### 1. Call Opening")
-        st.warning("“I was looking at your historical project history and noticed a significant shift. We used to partner closely on [Category] projects, but it’s been about nine months since our last order. Usually, when a partner of your size stops ordering, it’s because we either missed a beat on service or a competitor moved the goalposts. I’m calling to see which one it was.”")
-        st.caption("**The Logic:** Radical transparency. Acknowledges the gap in time to build immediate trust.")
-
-        # 2. Discovery Questions
-        st.markdown("### 2. Diagnostic Discovery")
-        st.warning("“When you moved that volume away, was it driven by a specific service failure, or did a competitor offer a specific capability we were lacking? If I could provide a 'shadow quote' on your next project—just to give you a baseline to keep your current supplier honest—would you be open to that?”")
-        st.caption("**The Logic:** Diagnostic focus. Intelligence gathering over selling.")
-
-        # 3. Objection Handling
-        st.markdown("### 3. Objection Handling (Pushback: 'We have a new supplier')")
-        st.warning("“I respect that. Stability is important. I’m not asking you to fire them; I’m asking to be your 'Plan B.' If they have a stock-out or a price hike, you shouldn't have to start from scratch. Let’s keep your account active as a safety net.”")
-        st.caption("**The Logic:** Acknowledge and Reframe. Positions the rep as a useful 'Plan B' backup.")
-
-        # 4. Evolution/Cross-Sell Prompt
-        st.markdown("### 4. Evolution Prompt")
-        st.warning("“Since we last worked together, we’ve overhauled our [New Product Line]. Based on your previous specs, these might actually solve the [Old Pain Point] we discussed last year. Would you like the new spec sheet?”")
-        st.caption("**The Logic:** Shows 'things have changed' since they left, giving them a reason to look again.")
-
-        # 5. Follow-Up Email
-        st.markdown("### 5. Follow-Up Email")
-        st.warning("**Subject:** Following up / Project History [Account Name]\n\n“Thanks for the candid feedback. I've noted your comments regarding [Reason for Leaving]. I’ve attached our updated 2024 catalog. Even if you're set with your current supplier, I'd appreciate the chance to bid on your next 'rush' order just to show you the improvements we've made.”")
+    playbook_phases = {"Playbook: Phase 1A (Active/No Coverage)": 'Phase 1A',
+                       "Playbook: Phase 1B (Dormant/Recovery)": 'Phase 1B'}
+
+    if selection in playbook_phases:
+        phase = playbook_phases[selection]
+        playbook = PLAYBOOKS[phase]
+        scripts = {column: script for column, _, script, _ in playbook['sections']}
+
+        if st.toggle("Fill in account details", help="Fill the [placeholders] from an account's order history and leakage reason."):
+            contexts, version = get_playbook_contexts()
+            accounts = contexts.loc[contexts['recommended_phase'] == phase, 'customer_id'].tolist()
+            labels = dict(zip(contexts['customer_id'], contexts['customer_id'] + " — " + contexts['account_name']))
+            customer_id = st.selectbox("Account (best ROI first)", accounts, format_func=labels.get)
+            if customer_id:
+                scripts = personal_playbook(customer_id, version)
+            st.download_button(f"⬇️ Download call sheets for all {len(contexts):,} Phase 1A/1B accounts",
+                               data=lambda: call_sheets(contexts, version), file_name="call_sheets.csv", mime="text/csv")
+
+        st.subheader(playbook['strategy'])
+        st.info(playbook['intent'])
+        script_box = st.success if phase == 'Phase 1A' else st.warning
+        for column, heading, _, logic in playbook['sections']:
+            st.markdown(f"### {heading}")
+            script_box(scripts[column])
+            if logic:
+                st.caption(logic)
 
         st.divider()
-        st.markdown("**Note for Reps:** This account requires re-engagement. Focus on recovery and trust-building.")
+        st.markdown(playbook['note'])
 
     elif selection == "Product 0: How Data Shapes Execution":
         st.subheader("Why Product Zero Inputs Matter")
@@ -394,12 +622,12 @@ elif page == "Product 0: Phase Deep-Dives":
 
     selected_phase = st.selectbox("Select Strategy Phase", ['Phase 1A', 'Phase 1B', 'Phase 2', 'Phase 3'])
     
-    phase_data = action_df[action_df['recommended_phase'] == selected_phase].sort_values('roi_speed_score', ascending=False)
+    phase_data = get_phase_index().phase(selected_phase)
     
     col_a, col_b = st.columns([2, 1])
     with col_a:
         st.subheader(f"Target Accounts: {selected_phase}")
-        st.dataframe(phase_data[['account_name', 'account_status', 'roi_speed_score', 'primary_reason']], use_container_width=True)
+        show_table('phase_accounts', phase_data[['account_name', 'account_status', 'roi_speed_score', 'primary_reason']])
     
     with col_b:
         st.metric("Phase Account Count", len(phase_data))
@@ -416,13 +644,16 @@ elif page == "Product 0: Phase Deep-Dives":
         else:
             st.write("Low potential or stable small accounts. Monitor through automated or low-touch channels.")
 
-        csv = phase_data.to_csv(index=False).encode('utf-8')
+        with span('table_serialize'):
+            csv = phase_data.to_csv(index=False).encode('utf-8')
+        record_payload('download', f"{selected_phase}_list.csv", len(csv))
         st.download_button("📥 Export List to CSV", data=csv, file_name=f"{selected_phase}_list.csv")
 
 # --- PAGE 6: STRATEGY & ROI LOGIC ---
 # --- PAGE 6: STRATEGY & ROI LOGIC ---
 elif page == "Strategy & ROI Logic":
     st.title("🎯 The 'How' and 'Why': Logic & Formulas")
+    action_df = get_actions()
     st.markdown("This section documents the mathematical framework used to prioritize accounts and identify coverage gaps.")
 
     # 1. ROI Speed Score Formula
@@ -474,11 +705,49 @@ elif page == "Strategy & ROI Logic":
     st.divider()
     st.subheader("Outcome: Priority Heatmap")
     st.markdown("The cluster below represents the final application of these 4 formulas.")
-    fig_scatter = px.scatter(action_df, x='roi_speed_score', y='priority_label', 
-                             color='recommended_phase', size='roi_speed_score',
-                             hover_name='account_name', title="Opportunity Heatmap",
-                             labels={'roi_speed_score': 'ROI Speed Score', 'priority_label': 'Priority'})
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    # Accounts sharing a score, priority and phase are drawn as one marker sized by account count
+    fig_scatter = cached_figure('opportunity_heatmap', actions_version(), lambda: scatter_figure(
+                             action_df, x='roi_speed_score', y='priority_label', 
+                             color='recommended_phase', hover_name='account_name', title="Opportunity Heatmap",
+                             labels={'roi_speed_score': 'ROI Speed Score', 'priority_label': 'Priority'}))
+    show_chart(fig_scatter)
+
+last_render = finish_render()
 
 st.sidebar.markdown("---")
+# Debug view: footprint of every frame loaded in this process, before and after the compact schema
+with st.sidebar.expander("🧠 Memory Report"):
+    if MEMORY_REPORT:
+        report = pd.DataFrame.from_dict(MEMORY_REPORT, orient='index')
+        shared = sum(key_dictionary_bytes().values())
+        report.loc['(shared keys)'] = [None, None, shared]
+        report['rows'] = report['rows'].astype('Int64')
+        report['saved'] = (1 - report['after'] / report['before']).map(lambda x: f"{x:.0%}" if pd.notna(x) else '')
+        report[['before', 'after']] = (report[['before', 'after']] / 1024).round(1)
+        st.dataframe(report.rename(columns={'before': 'before (KB)', 'after': 'after (KB)'}), use_container_width=True)
+    else:
+        st.caption("No data loaded yet.")
+    store = data_store()
+    st.caption(f"Snapshot v{snapshot.version} · {len(store.versions())} version(s) retained, "
+               f"{store.retained_bytes() / 2**20:.1f} MB shared across sessions")
+    if store.last_error:
+        st.caption(f"Last background refresh failed: {store.last_error}")
+# Admin view (open the app with ?admin=1): where render time goes, cache effectiveness and payload sizes
+if st.query_params.get('admin') == '1':
+    with st.sidebar.expander("⏱️ Performance"):
+        st.caption(f"This render: {last_render['spans_ms']['total']:,.0f} ms")
+        st.dataframe(pd.Series(last_render['spans_ms'], name='ms'), use_container_width=True)
+        timings = percentiles()
+        st.markdown("**p50 / p95 by page and phase** (recent renders)")
+        st.dataframe(timings[timings['page'] == page].drop(columns='page'), use_container_width=True, hide_index=True)
+        with st.popover("All pages"):
+            st.dataframe(timings, use_container_width=True, hide_index=True)
+        st.markdown("**Cache hits / misses**")
+        st.dataframe(cache_stats(), use_container_width=True, hide_index=True)
+        if last_render['payloads']:
+            st.markdown("**Payloads this render**")
+            payloads = pd.DataFrame(last_render['payloads'])
+            payloads['KB'] = (payloads.pop('bytes') / 1024).round(1)
+            st.dataframe(payloads, use_container_width=True, hide_index=True)
+        st.caption(f"Every render is logged as a JSON line to `{LOG_PATH}`; `python telemetry.py` summarizes it over time.")
 st.sidebar.caption("Product Zero Dashboard v1.1 | Execution Framework")
@@ -0,0 +1,125 @@
+"""Regenerate every derived artifact without Streamlit, e.g. as a nightly job.
+
+    python batch.py --out exports --workers 8
+
+Writes the leakage audit, next best call list, coverage audit and one CSV + Parquet
+list per phase (the files the dashboard's "Export List to CSV" button produces).
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data_loader import LEAKAGE_FILE, NEXT_CALL_FILE, load_sources, read_orders, refresh_order_store, write_atomic
+from engines import (LEAKAGE_COLUMNS, LEAKAGE_SCHEMA, ROI_COLUMNS, apply_roi_scores, classify_coverage, fold_activity,
+                     leakage_from_activity, next_best_calls, roi_speed_scores)
+from indexes import PhaseIndex
+
+COVERAGE_AUDIT_FILE = 'account_coverage_audit.csv'
+
+
+# Customer activity of one group of order store partitions, folded in a worker process.
+# The group is read in one go: streaming it would fold one small batch per partition.
+def _fold_files(manifest, files):
+    return fold_activity([read_orders(dict(manifest, files=files), LEAKAGE_COLUMNS)])
+
+
+def shard_files(manifest, shards):
+    # Round-robin over the month-ordered partitions so every group spans the history evenly
+    files = manifest['files']
+    return [files[i::shards] for i in range(shards) if files[i::shards]]
+
+
+def sharded_leakage(manifest, as_of=None, workers=None, shards=None):
+    """detect_leakage over the order store as `manifest` describes it, with its partitions
+    split across a process pool.
+
+    Each worker folds its partitions into customer x month totals; the totals are additive,
+    so their sum is the fold of the whole history and one leakage_from_activity over it
+    matches a single pass. Every partition is read once, whatever the shard count.
+    """
+    workers = workers or os.cpu_count() or 1
+    parts = shard_files(manifest, shards or workers)
+    if workers <= 1 or len(parts) <= 1:
+        folds = [_fold_files(manifest, part) for part in parts]
+    else:
+        with ProcessPoolExecutor(min(workers, len(parts))) as pool:
+            folds = list(pool.map(_fold_files, [manifest] * len(parts), parts))
+
+    folds = [fold for fold in folds if fold[0] is not None]
+    if not folds:
+        return pd.DataFrame(columns=LEAKAGE_SCHEMA)
+    # A customer-month split across groups (a late drop) is summed back into one row
+    totals = pd.concat(part for part, _ in folds).groupby(level=['customer_id', 'month']).sum()
+    account_names = pd.concat(names for _, names in folds)
+    account_names = account_names[~account_names.index.duplicated(keep='last')]
+
+    months = None
+    if as_of is not None:
+        # Pin the month axis so an as-of date past the last order still has its windows
+        observed = totals.index.get_level_values('month')
+        months = (observed.min(), max(observed.max(), pd.Period(as_of, freq='M')))
+    return leakage_from_activity(totals, account_names, as_of=as_of, months=months)
+
+
+def write_csv(df, path):
+    write_atomic(path, lambda p: df.to_csv(p, index=False))
+
+
+def write_parquet(df, path):
+    write_atomic(path, lambda p: df.to_parquet(p, index=False))
+
+
+def run(out_dir, workers=None, shards=None, as_of=None, use_static_scores=False):
+    # Returns {file name: rows written}
+    sources = load_sources(('actions', 'coverage'))
+    actions = sources['actions']
+    # Ingest once up front; every read below, in this process and the workers, uses this manifest
+    manifest = refresh_order_store()
+    if not use_static_scores:
+        orders = read_orders(manifest, ROI_COLUMNS)
+        phases = actions.set_index('customer_id')['recommended_phase']
+        actions = apply_roi_scores(actions, roi_speed_scores(orders, phases=phases, as_of=as_of))
+
+    leakage = sharded_leakage(manifest, as_of=as_of, workers=workers, shards=shards)
+    outputs = {
+        os.path.basename(LEAKAGE_FILE): leakage,
+        os.path.basename(NEXT_CALL_FILE): next_best_calls(leakage),
+        COVERAGE_AUDIT_FILE: classify_coverage(actions, sources['coverage']),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    for name, df in outputs.items():
+        write_csv(df, os.path.join(out_dir, name))
+
+    # Same ordering and columns as the Phase Deep-Dives export
+    phase_index = PhaseIndex(actions)
+    for phase in phase_index.phases():
+        phase_data = phase_index.phase(phase)
+        write_csv(phase_data, os.path.join(out_dir, f"{phase}_list.csv"))
+        write_parquet(phase_data, os.path.join(out_dir, f"{phase}_list.parquet"))
+        outputs[f"{phase}_list.csv"] = outputs[f"{phase}_list.parquet"] = phase_data
+    return {name: len(df) for name, df in outputs.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate the leakage, coverage and phase exports.")
+    parser.add_argument('--out', default='exports', help="output directory (default: exports)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--shards', type=int, default=None, help="order partition groups (default: one per worker)")
+    parser.add_argument('--as-of', default=None, help="score as of this date (default: latest order)")
+    parser.add_argument('--use-static-scores', action='store_true',
+                        help="keep the workbook's ROI scores instead of recomputing them from the orders")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    written = run(args.out, workers=args.workers, shards=args.shards, as_of=args.as_of,
+                  use_static_scores=args.use_static_scores)
+    for name, rows in written.items():
+        print(f"{os.path.join(args.out, name)}: {rows:,} rows")
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
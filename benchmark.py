@@ -0,0 +1,327 @@
+"""Scale benchmarks for the dashboard's load, aggregation and figure-building steps.
+
+    python benchmark.py --sizes 10k 1M --out bench.json
+    python benchmark.py --sizes 10k 1M --baseline bench.json   # exit 1 on a regression
+
+Every step runs `--repeat` times untraced for timing (the median is reported), then once
+under tracemalloc for its peak Python/NumPy allocation. Arrow buffers are not seen by
+tracemalloc; the process's peak RSS after each size covers them. Data comes from
+synthetic.py with a fixed seed, so runs on the same machine are comparable.
+
+Sizes that fit in an Excel sheet also time the app's real load path: the sources parsed
+from the mock workbooks, seeding the order store, a full snapshot build, and the leakage
+audit brought up to date after a drop of new orders. Excel parsing is slow at 1M rows;
+`--skip-excel` leaves those steps out.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+import plotly.express as px
+import pyarrow as pa
+
+from charts import histogram_figure, line_figure, pie_figure, scatter_figure
+from data_loader import CACHE_DIR, DROP_DIR, compact, load_sources, refresh_order_store
+from engines import (LEAKAGE_COLUMNS, ROI_COLUMNS, apply_roi_scores, classify_coverage, detect_leakage,
+                     leakage_from_activity, roi_speed_scores)
+from explorer import TableIndex
+from indexes import AccountIndex, PhaseIndex
+from playbooks import playbook_contexts
+from rollups import ACTIVITY_DIR, ROLLUP_DIR, RollupCube, filtered_rollups, order_table, refresh_activity
+from snapshot import ENTRIES, build_snapshot, snapshot_fingerprint
+from synthetic import EXCEL_MAX_ROWS, SIZES, generate, parse_rows, write_dataset
+
+MAX_SLOWDOWN = 1.5  # median slower than baseline x this counts as a regression
+NOISE_FLOOR = 0.05  # seconds; smaller absolute slowdowns are ignored
+DROP_ROWS = 1_000  # orders in each drop appended for the incremental steps
+
+
+# --- STEPS ---
+# Each step takes the shared context and returns what later steps need (merged into it).
+# Names are "<page>.<step>" so a regression points at the page it slows down. A step may
+# name a setup function too, run untimed (and untraced) before every run of the step.
+def _load_orders(ctx):
+    return {'orders': pd.read_parquet(ctx['orders_path'])}
+
+
+def _load_sources(ctx):
+    return {'actions': compact(pd.read_parquet(ctx['actions_path']), 'actions'),
+            'coverage': compact(pd.read_parquet(ctx['coverage_path']), 'coverage')}
+
+
+def _compact_orders(ctx):
+    return {'compacted': compact(ctx['raw_orders'])}
+
+
+def _roi_scores(ctx):
+    actions = ctx['actions']
+    scores = roi_speed_scores(ctx['orders'][list(ROI_COLUMNS)],
+                              phases=actions.set_index('customer_id')['recommended_phase'])
+    return {'scored': apply_roi_scores(actions, scores)}
+
+
+def _leakage(ctx):
+    return {'leakage': detect_leakage([ctx['orders'][list(LEAKAGE_COLUMNS)]])}
+
+
+def _coverage(ctx):
+    return {'coverage_audit': classify_coverage(ctx['scored'], ctx['coverage'])}
+
+
+def _rollups(ctx):
+    return {'rollups': RollupCube.build(ctx['orders'])}
+
+
+def _canonical_figures(ctx):
+    rollups = ctx['rollups']
+    return {'figures': [
+        px.bar(rollups.category_revenue(), x='category', y='order_value', color='category'),
+        line_figure(rollups.monthly_revenue(), x='order_date', y='order_value', markers=True),
+        histogram_figure(rollups.margin_histogram(), 'margin'),
+        px.bar(rollups.top_accounts(), x='order_value', y='account_name', orientation='h'),
+    ]}
+
+
+def _order_table(ctx):
+    return {'order_table': order_table(ctx['orders'])}
+
+
+def _canonical_filter(ctx):
+    # One sidebar change: a category and a half-year of orders, all four charts' inputs
+    category = ctx['orders']['category'].cat.categories[0]
+    rollups = filtered_rollups(ctx['order_table'], ctx['rollups'].margin_width,
+                               date_range=('2024-04-01', '2024-09-30'), equals={'category': [category]})
+    return {'filtered': [rollups.category_revenue(), rollups.monthly_revenue(), rollups.top_accounts(),
+                         rollups.margin_histogram()]}
+
+
+def _canonical_explorer(ctx):
+    index = TableIndex(ctx['orders'], keys=('category', 'rep_role', 'account_name'), date_column='order_date')
+    positions = index.select(equals={'category': [index.options('category')[0]]})
+    rows, _ = index.page(positions, sort_by='order_value', ascending=False)
+    return {'explorer_rows': rows}
+
+
+def _summary_figures(ctx):
+    scored = ctx['scored']
+    return {'figures': [
+        pie_figure(scored, names='recommended_phase', hole=0.4),
+        scatter_figure(scored, x='roi_speed_score', y='priority_label', color='recommended_phase',
+                       hover_name='account_name'),
+    ]}
+
+
+def _phase_lists(ctx):
+    index = PhaseIndex(ctx['scored'])
+    return {'top_10': index.top(10), 'phase_1a': index.phase('Phase 1A')}
+
+
+def _account_360(ctx):
+    index = AccountIndex({'actions': ctx['scored'], 'coverage': ctx['coverage_audit'],
+                          'leakage': ctx['leakage'], 'orders': ctx['orders']})
+    return {'account': index.lookup(ctx['scored']['customer_id'].iloc[0])}
+
+
+def _playbook_contexts(ctx):
+    return {'contexts': playbook_contexts(ctx['scored'], ctx['orders'], ctx['leakage'])}
+
+
+STEPS = [
+    ('load.orders', _load_orders),
+    ('load.sources', _load_sources),
+    ('load.compact', _compact_orders),
+    ('scores.roi', _roi_scores),
+    ('scores.leakage', _leakage),
+    ('scores.coverage', _coverage),
+    ('canonical.rollups', _rollups),
+    ('canonical.figures', _canonical_figures),
+    ('canonical.order_table', _order_table),
+    ('canonical.filter', _canonical_filter),
+    ('canonical.explorer', _canonical_explorer),
+    ('summary.figures', _summary_figures),
+    ('phases.lists', _phase_lists),
+    ('account360.index', _account_360),
+    ('playbooks.contexts', _playbook_contexts),
+]
+
+
+# --- REAL LOAD PATH ---
+# The steps above start from Parquet copies; these run the app's own loaders against the
+# mock file names written by `synthetic.py --excel`, in a scratch working directory.
+@contextmanager
+def _app_dir(ctx):
+    cwd = os.getcwd()
+    os.chdir(ctx['app_dir'])
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def _excel_sources(ctx):
+    with _app_dir(ctx):
+        return {'excel_sources': load_sources()}
+
+
+def _order_store(ctx):
+    # Cold: parse and compact the canonical workbook, then seed the store from it
+    with _app_dir(ctx):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        return {'manifest': refresh_order_store()}
+
+
+def _snapshot(ctx):
+    # Every entry of a first snapshot over the seeded store, persisted rollups and activity cleared
+    with _app_dir(ctx):
+        for root in (ROLLUP_DIR, ACTIVITY_DIR):
+            shutil.rmtree(root, ignore_errors=True)
+        snapshot = build_snapshot(1, snapshot_fingerprint())
+        for name in ENTRIES:
+            snapshot[name]
+    return {}
+
+
+def _append_drop(ctx):
+    # A fresh drop of new orders dated after the watermark, ingested into the store
+    with _app_dir(ctx):
+        count = ctx.get('drops', 0) + 1
+        drop = ctx['raw_orders'].sample(min(DROP_ROWS, len(ctx['raw_orders'])), random_state=count)
+        drop = drop.assign(order_id=[f"DROP_{count}_{i}" for i in range(len(drop))],
+                           order_date=pd.Timestamp(ctx['manifest']['watermark']) + pd.Timedelta(days=1))
+        os.makedirs(DROP_DIR, exist_ok=True)
+        drop.to_csv(os.path.join(DROP_DIR, f"drop-{count}.csv"), index=False)
+        return {'drops': count, 'manifest': refresh_order_store()}
+
+
+def _drop_leakage(ctx):
+    # The incremental path after a drop: fold the new partition into the persisted activity
+    with _app_dir(ctx):
+        activity = refresh_activity(ctx['manifest'])
+        return {'leakage': leakage_from_activity(activity.totals, activity.account_names)}
+
+
+EXCEL_STEPS = [
+    ('load.excel_sources', _excel_sources),
+    ('load.order_store', _order_store),
+    ('snapshot.build', _snapshot),
+    ('drop.leakage', _drop_leakage, _append_drop),
+]
+
+
+def _payload_bytes(figures):
+    # What the browser would receive for these figures
+    return sum(len(fig.to_json()) for fig in figures)
+
+
+def run_size(rows, repeat=3, seed=0, steps=STEPS, excel=True):
+    """{step: {'median_s', 'min_s', 'peak_mb'[, 'payload_kb']}} for one data size.
+
+    With `excel`, the EXCEL_STEPS run too when `rows` fit in an Excel sheet.
+    """
+    data = generate(rows, seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = {'raw_orders': data['orders'], 'orders_path': os.path.join(tmp, 'orders.parquet'),
+               'actions_path': os.path.join(tmp, 'actions.parquet'), 'coverage_path': os.path.join(tmp, 'coverage.parquet'),
+               'app_dir': os.path.join(tmp, 'app')}
+        compact(data['orders']).to_parquet(ctx['orders_path'], index=False)
+        data['actions'].to_parquet(ctx['actions_path'], index=False)
+        data['coverage'][['customer_id', 'rep_role']].to_parquet(ctx['coverage_path'], index=False)
+        if excel and rows <= EXCEL_MAX_ROWS:
+            write_dataset(data, ctx['app_dir'], excel=True)
+            steps = steps + EXCEL_STEPS
+        del data
+
+        for name, step, *setup in steps:
+            timings = []
+            for _ in range(repeat):
+                for prepare in setup:
+                    ctx.update(prepare(ctx))
+                started = time.perf_counter()
+                output = step(ctx)
+                timings.append(time.perf_counter() - started)
+
+            for prepare in setup:
+                ctx.update(prepare(ctx))
+            tracemalloc.start()
+            step(ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            results[name] = {'median_s': round(statistics.median(timings), 4), 'min_s': round(min(timings), 4),
+                             'peak_mb': round(peak / 2**20, 1)}
+            if 'figures' in output:
+                results[name]['payload_kb'] = round(_payload_bytes(output['figures']) / 1024, 1)
+            ctx.update(output)
+    return results
+
+
+def compare(results, baseline, max_slowdown=MAX_SLOWDOWN, noise_floor=NOISE_FLOOR):
+    # [(size, step, baseline median, new median)] for every step that got slower than allowed
+    regressions = []
+    for size, steps in results.items():
+        for step, new in steps.items():
+            old = baseline.get(size, {}).get(step)
+            if old and new['median_s'] > old['median_s'] * max_slowdown and new['median_s'] - old['median_s'] > noise_floor:
+                regressions.append((size, step, old['median_s'], new['median_s']))
+    return regressions
+
+
+def _print_table(size, steps):
+    print(f"\n{size} orders")
+    print(f"  {'step':<22}{'median s':>10}{'min s':>10}{'peak MB':>10}{'payload KB':>12}")
+    for step, r in steps.items():
+        payload = f"{r['payload_kb']:>12}" if 'payload_kb' in r else f"{'':>12}"
+        print(f"  {step:<22}{r['median_s']:>10}{r['min_s']:>10}{r['peak_mb']:>10}{payload}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the dashboard pipeline on synthetic data.")
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1M'], help=f"order counts ({', '.join(SIZES)} or a number)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help="write the results as JSON")
+    parser.add_argument('--baseline', default=None, help="JSON from an earlier run to check for regressions")
+    parser.add_argument('--max-slowdown', type=float, default=MAX_SLOWDOWN)
+    parser.add_argument('--skip-excel', action='store_true', help="leave out the steps that parse the Excel files")
+    args = parser.parse_args(argv)
+
+    results, peak_rss = {}, {}
+    for size in args.sizes:
+        results[size] = run_size(parse_rows(size), repeat=args.repeat, seed=args.seed, excel=not args.skip_excel)
+        # ru_maxrss is KB on Linux; it only grows, so run sizes in ascending order
+        peak_rss[size] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        _print_table(size, results[size])
+        print(f"  process peak RSS: {peak_rss[size]} MB")
+
+    report = {'meta': {'python': platform.python_version(), 'pandas': pd.__version__, 'pyarrow': pa.__version__,
+                       'machine': platform.platform(), 'cpus': os.cpu_count(), 'seed': args.seed,
+                       'repeat': args.repeat},
+              'results': results, 'peak_rss_mb': peak_rss}
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)['results']
+        regressions = compare(results, baseline, args.max_slowdown)
+        for size, step, old, new in regressions:
+            print(f"REGRESSION {size} {step}: {old:.3f}s -> {new:.3f}s ({new / old:.1f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"\nNo step slower than {args.max_slowdown}x the baseline.")
+
+
+if __name__ == '__main__':
+    main()
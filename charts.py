@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# --- PAYLOAD-AWARE FIGURES ---
+# Figures are built from server-side aggregates so their size is capped by MAX_POINTS,
+# not by the number of rows behind them
+MAX_POINTS = 2000
+
+
+def histogram_bins(values, bins='auto', value_range=None):
+    counts, edges = np.histogram(np.asarray(values, dtype=float), bins=bins, range=value_range)
+    return pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'count': counts})
+
+
+# Pre-binned counts drawn as touching bars, the way px.histogram would show them. Passed as a
+# frame so an empty slice (no bins) still draws an empty chart
+def histogram_figure(bins, x_label, **px_kwargs):
+    points = pd.DataFrame({x_label: (bins['bin_start'] + bins['bin_end']) / 2, 'count': bins['count']})
+    fig = px.bar(points, x=x_label, y='count', **px_kwargs)
+    fig.update_traces(width=(bins['bin_end'] - bins['bin_start']).to_numpy())
+    fig.update_layout(bargap=0)
+    return fig
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: positions of `threshold` points that keep the shape of (x, y)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Interior points split into threshold - 2 buckets; first and last points always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    picked = np.empty(threshold, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(area.argmax())
+        picked[i + 1] = prev
+    return picked
+
+
+def line_figure(df, x, y, max_points=MAX_POINTS, **px_kwargs):
+    df = df.sort_values(x)
+    if len(df) > max_points:
+        df = df.iloc[lttb(pd.to_numeric(df[x]), df[y], max_points)]
+    return px.line(df, x=x, y=y, **px_kwargs)
+
+
+def aggregate_points(df, x, y, color, hover_name, max_points=MAX_POINTS):
+    """Collapse rows sharing (x, y, color) into one point with an `accounts` count.
+
+    If that still leaves more than `max_points`, x is snapped to coarser buckets until it fits.
+    """
+    values = df[x].astype(float)
+    span = values.max() - values.min()
+    step = 0
+    while True:
+        snapped = values if step == 0 else (values / step).round() * step
+        grouped = (df.assign(**{x: snapped})
+                   .groupby([x, y, color], observed=True)
+                   .agg(accounts=(hover_name, 'size'), example=(hover_name, 'first'))
+                   .reset_index())
+        if len(grouped) <= max_points or not span:
+            return grouped
+        step = span / 100 if step == 0 else step * 2
+
+
+# One marker per (x, y, color) group, sized by how many accounts it stands for
+def scatter_figure(df, x, y, color, hover_name, max_points=MAX_POINTS, **px_kwargs):
+    points = aggregate_points(df, x, y, color, hover_name, max_points)
+    return px.scatter(points, x=x, y=y, color=color, size='accounts', hover_name='example',
+                      hover_data={'accounts': True}, **px_kwargs)
+
+
+# Category shares from counts rather than one row per record
+def pie_figure(df, names, **px_kwargs):
+    counts = df[names].value_counts().rename_axis(names).reset_index(name='count')
+    return px.pie(counts, names=names, values='count', **px_kwargs)
@@ -0,0 +1,457 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the store is only guarded within one process
+    fcntl = None
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from telemetry import in_render, record_hit, span
+
+# --- SOURCE FILES ---
+STRATEGY_FILE = 'Mock-productzero-sheet 2.xlsx'
+STRATEGY_SHEETS = ('Executive_Overview', 'Account_Action_List', 'ROI_Logic_Explained', 'Phase_Summary')
+COVERAGE_FILE = 'mock_day1-2_account_coverage.xlsx'
+COVERAGE_SHEET = 'in'
+LEAKAGE_FILE = 'revenue_leakage_detector.csv'
+NEXT_CALL_FILE = 'next_best_call_list.csv'
+CANONICAL_FILE = 'canonical_dataset.xlsx'
+
+# Columnar copies of the Excel sources live here (git-ignored, safe to delete)
+CACHE_DIR = '.cache'
+# Bump when the stored layout changes so existing caches are rebuilt
+CACHE_FORMAT = 2
+
+# --- COMPACT SCHEMA ---
+# Repeated strings become categoricals, integers are downcast. Money columns
+# (order_value, est_recoverable_revenue) stay float64 so large sums keep their cents.
+CATEGORICAL_COLUMNS = ('customer_id', 'account_name', 'sku', 'category', 'rep_id', 'rep_role', 'recommended_phase',
+                       'account_status', 'priority_label', 'recommended_action', 'assigned_rep', 'coverage_flag',
+                       'leakage_type')
+FLOAT32_COLUMNS = ('margin',)
+# Keys shared across frames draw their categories from one process-wide registry
+SHARED_KEYS = ('customer_id', 'account_name')
+
+# name -> {'rows', 'before', 'after'} (deep bytes) for every frame compacted in this process
+MEMORY_REPORT = {}
+
+_key_dtypes = {}
+_key_lock = threading.Lock()
+
+
+# Cheap fingerprint used as a cache key: changes whenever the file is rewritten
+def source_version(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(name):
+    base = os.path.join(CACHE_DIR, name)
+    return base + '.parquet', base + '.meta.json'
+
+
+def read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def dump_json(obj, path):
+    with open(path, 'w') as fh:
+        json.dump(obj, fh)
+
+
+def write_atomic(path, write):
+    # A temp file of its own beside the target, so concurrent writers (threads or processes) never share one
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=os.path.dirname(path) or '.')
+    os.close(fd)
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it owner-only
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def columnar_cache(source, name, parse):
+    """Return the path of a Parquet copy of `source`, rebuilding it with `parse` when stale.
+
+    Freshness is checked on mtime/size first; if those moved (e.g. a fresh git
+    checkout) the content hash decides whether the parse is really needed.
+    """
+    parquet_path, meta_path = _cache_paths(name)
+    mtime_ns, size = source_version(source)
+    meta = read_json(meta_path)
+
+    if meta and meta.get('format') != CACHE_FORMAT:
+        meta = None
+
+    if meta and os.path.exists(parquet_path):
+        if meta.get('memory'):
+            MEMORY_REPORT.setdefault(name, meta['memory'])
+        if meta['mtime_ns'] == mtime_ns and meta['size'] == size:
+            record_hit('columnar_cache', True)
+            return parquet_path
+        digest = _file_hash(source)
+        if meta['sha256'] == digest:
+            meta.update(mtime_ns=mtime_ns, size=size)
+            write_atomic(meta_path, lambda p: dump_json(meta, p))
+            record_hit('columnar_cache', True)
+            return parquet_path
+    else:
+        digest = _file_hash(source)
+
+    record_hit('columnar_cache', False)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with span('excel_parse'):
+        df = compact(parse(source), name)
+    write_atomic(parquet_path, lambda p: df.to_parquet(p, index=False))
+    meta = {'source': source, 'mtime_ns': mtime_ns, 'size': size, 'sha256': digest,
+            'format': CACHE_FORMAT, 'memory': MEMORY_REPORT[name]}
+    write_atomic(meta_path, lambda p: dump_json(meta, p))
+    return parquet_path
+
+
+def _shared_dtype(col, values):
+    # Extend the registry with any unseen keys; frames loaded together share one dtype object
+    with _key_lock:
+        dtype = _key_dtypes.get(col)
+        known = dtype.categories if dtype is not None else pd.Index([], dtype=str)
+        new = pd.Index(values.dropna().unique()).difference(known)
+        if dtype is None or len(new):
+            dtype = pd.CategoricalDtype(known.append(new).sort_values())
+            _key_dtypes[col] = dtype
+        return dtype
+
+
+def compact(df, name=None):
+    """Apply the compact schema to `df` and record its before/after footprint under `name`."""
+    before = int(df.memory_usage(deep=True).sum())
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        is_text = pd.api.types.is_string_dtype(series) or pd.api.types.is_object_dtype(series)
+        if col in SHARED_KEYS and is_text:
+            df[col] = series.astype(_shared_dtype(col, series))
+        elif col in CATEGORICAL_COLUMNS and is_text and series.nunique() <= len(series) // 2:
+            df[col] = series.astype('category')
+        elif col in FLOAT32_COLUMNS:
+            df[col] = series.astype('float32')
+        elif pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+    if name:
+        MEMORY_REPORT[name] = {'rows': len(df), 'before': before, 'after': _frame_bytes(df)}
+    return df
+
+
+# Deep size, leaving out shared key dictionaries (held once by the registry, see key_dictionary_bytes)
+def _frame_bytes(df):
+    size = int(df.memory_usage(deep=True).sum())
+    for col in SHARED_KEYS:
+        if col in df and isinstance(df[col].dtype, pd.CategoricalDtype) and df[col].dtype == _key_dtypes.get(col):
+            size -= int(df[col].cat.categories.memory_usage(deep=True))
+    return size
+
+
+def key_dictionary_bytes():
+    return {col: int(dtype.categories.memory_usage(deep=True)) for col, dtype in _key_dtypes.items()}
+
+
+# --- CANONICAL ORDER HISTORY ---
+def _parse_canonical(path):
+    df = pd.read_excel(path)
+    # Ensure date format is correct for time-series analysis
+    df['order_date'] = pd.to_datetime(df['order_date'])
+    return df
+
+
+# --- ORDER STORE ---
+# Append-only copy of the order history, one directory per order month. It is seeded from
+# the canonical workbook and grows by ingesting order drops (CSV/xlsx) from DROP_DIR.
+# _manifest.json lists the live files, so readers only ever see fully written partitions.
+# Each seed writes a fresh generation directory, so a re-seed never deletes files under a reader.
+ORDER_STORE = os.path.join(CACHE_DIR, 'orders')
+DROP_DIR = 'order_drops'
+DROP_EXTENSIONS = ('.csv', '.xlsx')
+
+# Columns every dropped order must fill in; the rep columns may stay empty (an uncovered account)
+DROP_REQUIRED = ('order_id', 'order_date', 'customer_id', 'account_name', 'order_value', 'category', 'margin')
+DROP_NUMERIC = ('order_value', 'margin')
+
+_locks = {}  # path -> RLock
+_locks_guard = threading.Lock()
+_held = threading.local()
+
+
+@contextmanager
+def locked(path):
+    """Exclusive use of the cache at `path`, re-entrant within a thread.
+
+    Threads of this process wait on an RLock, other processes (batch workers, a second
+    server) on an flock of a file beside `path`, which re-seeding never removes.
+    """
+    with _locks_guard:
+        lock = _locks.setdefault(os.path.abspath(path), threading.RLock())
+    with lock:
+        held = getattr(_held, 'paths', None)
+        if held is None:
+            held = _held.paths = set()
+        if fcntl is None or path in held:
+            yield
+            return
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.lock', 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            held.add(path)
+            try:
+                yield
+            finally:
+                held.discard(path)
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _manifest_path(root):
+    return os.path.join(root, '_manifest.json')
+
+
+def _store_schema(table_schema):
+    # Wider dictionary indices than the compacted base needs, so drops can add new keys
+    fields = [pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type)) if pa.types.is_dictionary(f.type) else f
+              for f in table_schema]
+    return pa.schema(fields, metadata=table_schema.metadata)
+
+
+def _write_partitions(orders, schema, sequence, root):
+    # One new file per order month touched; returns the store-relative paths
+    written = []
+    months = orders['order_date'].dt.strftime('%Y-%m')
+    for month, part in orders.groupby(months, sort=True):
+        relative = os.path.join(month, f"part-{sequence:05d}.parquet")
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(part, preserve_index=False).select(schema.names).cast(schema)
+        write_atomic(path, lambda p: pq.write_table(table, p))
+        written.append(relative)
+    return written
+
+
+def _generation_dir(manifest, root):
+    return os.path.join(root, manifest['generation'])
+
+
+def _seed_store(base_path, base_hash, root, previous=None):
+    """Seed a fresh generation directory from the base and swap the manifest over to it.
+
+    The generation `previous` pointed at is kept for readers still scanning it and
+    removed with the next seed; anything older goes now.
+    """
+    os.makedirs(root, exist_ok=True)
+    generation = os.path.basename(tempfile.mkdtemp(prefix='gen-', dir=root))
+    base = pd.read_parquet(base_path)
+    schema = _store_schema(pq.read_schema(base_path))
+    manifest = {'format': CACHE_FORMAT, 'base': base_hash, 'generation': generation, 'sequence': 0,
+                'order_count': len(base), 'watermark': base['order_date'].max().isoformat() if len(base) else None,
+                'files': _write_partitions(base, schema, 0, os.path.join(root, generation)), 'drops': {},
+                'rejected': {}}
+    write_atomic(_manifest_path(root), lambda p: dump_json(manifest, p))
+
+    keep = {generation, (previous or {}).get('generation')}
+    for entry in os.listdir(root):
+        if entry not in keep and os.path.isdir(os.path.join(root, entry)):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return manifest
+
+
+def _read_drop(path, schema):
+    # Text columns are read as text (IDs like 0042 keep their zeros); absent columns stay empty
+    text = {f.name: str for f in schema if pa.types.is_dictionary(f.type) or pa.types.is_large_string(f.type)
+            or pa.types.is_string(f.type)}
+    drop = pd.read_csv(path, dtype=text) if path.endswith('.csv') else pd.read_excel(path, dtype=text)
+    missing = set(DROP_REQUIRED) - set(drop.columns)
+    if missing:
+        raise ValueError(f"missing column(s): {', '.join(sorted(missing))}")
+    drop = drop.dropna(how='all').reindex(columns=schema.names).astype({col: 'string' for col in text})
+    drop['order_date'] = pd.to_datetime(drop['order_date'])
+    for col in DROP_NUMERIC:
+        drop[col] = pd.to_numeric(drop[col])
+    # One bad line rejects the whole drop, so it is fixed at the source rather than half-loaded
+    empty = [col for col in DROP_REQUIRED if drop[col].isna().any()]
+    if empty:
+        raise ValueError(f"empty value(s) in column(s): {', '.join(empty)}")
+    return drop.drop_duplicates('order_id')
+
+
+def _ingest_drop(manifest, path, root):
+    """Append the orders in `path` that the store does not hold yet; returns the rows added.
+
+    An order's month is fixed by its order_date, so duplicates are only looked for in the
+    partitions of the months the drop touches.
+    """
+    directory = _generation_dir(manifest, root)
+    schema = pq.read_schema(os.path.join(directory, manifest['files'][0]))
+    drop = _read_drop(path, schema)
+    months = set(drop['order_date'].dt.strftime('%Y-%m'))
+    touched = [os.path.join(directory, f) for f in manifest['files'] if os.path.dirname(f) in months]
+    if touched:
+        seen = pq.ParquetDataset(touched).read(columns=['order_id']).column('order_id').to_pylist()
+        drop = drop[~drop['order_id'].isin(seen)]
+    if drop.empty:
+        return 0
+
+    manifest['sequence'] += 1
+    manifest['files'] = sorted(manifest['files'] + _write_partitions(drop, schema, manifest['sequence'], directory))
+    manifest['order_count'] += len(drop)
+    watermark = drop['order_date'].max()
+    if manifest['watermark'] is not None:
+        watermark = max(watermark, pd.Timestamp(manifest['watermark']))
+    manifest['watermark'] = watermark.isoformat()
+    return len(drop)
+
+
+def refresh_order_store(source=CANONICAL_FILE, drop_dir=DROP_DIR, root=ORDER_STORE):
+    """Bring the order store up to date and return its manifest.
+
+    The store is re-seeded when the canonical workbook's content changes; otherwise only
+    drop files that are new (or rewritten) since the last refresh are read. A drop that
+    cannot be parsed is recorded under 'rejected' and skipped until it changes.
+    """
+    with locked(root):
+        base_path = columnar_cache(source, 'canonical_dataset', _parse_canonical)
+        base_hash = read_json(_cache_paths('canonical_dataset')[1])['sha256']
+        manifest = read_json(_manifest_path(root))
+        if (not manifest or manifest.get('format') != CACHE_FORMAT or manifest['base'] != base_hash
+                or 'generation' not in manifest):
+            manifest = _seed_store(base_path, base_hash, root, manifest)
+
+        drops = sorted(f for f in os.listdir(drop_dir) if f.endswith(DROP_EXTENSIONS)) if os.path.isdir(drop_dir) else []
+        pending = [f for f in drops if manifest['drops'].get(f) != list(source_version(os.path.join(drop_dir, f)))]
+        if not pending:
+            return manifest
+
+        for name in pending:
+            path = os.path.join(drop_dir, name)
+            try:
+                _ingest_drop(manifest, path, root)
+                manifest['rejected'].pop(name, None)
+            except (ValueError, KeyError, OSError) as e:
+                manifest['rejected'][name] = str(e)
+            manifest['drops'][name] = list(source_version(path))
+        write_atomic(_manifest_path(root), lambda p: dump_json(manifest, p))
+        return manifest
+
+
+def _part_sequence(relative):
+    # part-00042.parquet -> 42, the refresh that appended it (0 for the seed)
+    return int(os.path.basename(relative)[len('part-'):-len('.parquet')])
+
+
+def store_files(manifest, after=None, since=None, root=ORDER_STORE):
+    """Paths of the partitions `manifest` lists. `after` keeps only those appended after
+    that sequence number; `since` only those of order months from that date on."""
+    files = manifest['files']
+    if after is not None:
+        files = [f for f in files if _part_sequence(f) > after]
+    if since is not None:
+        files = [f for f in files if os.path.dirname(f) >= f"{pd.Timestamp(since):%Y-%m}"]
+    return [os.path.join(root, manifest['generation'], f) for f in files]
+
+
+def read_orders(manifest, columns=None, filters=None, after=None, since=None, root=ORDER_STORE):
+    # Only the requested columns (and the partitions/row groups matching `filters`) are read
+    files = store_files(manifest, after, since, root)
+    if not files:
+        schema = pq.read_schema(os.path.join(root, manifest['generation'], manifest['files'][0]))
+        table = schema.empty_table()
+        return table.select(list(columns) if columns else schema.names).to_pandas()
+    dataset = pq.ParquetDataset(files, filters=filters)
+    return dataset.read(columns=list(columns) if columns else None, use_pandas_metadata=True).to_pandas()
+
+
+# Streams the partitions in record batches so engines can keep memory bounded
+def iter_orders(manifest, columns=None, batch_size=500_000, after=None, root=ORDER_STORE):
+    dataset = ds.dataset(store_files(manifest, after, root=root), format='parquet')
+    for batch in dataset.to_batches(columns=list(columns) if columns else None, batch_size=batch_size):
+        yield batch.to_pandas()
+
+
+def load_canonical(columns=None, filters=None, source=CANONICAL_FILE):
+    return read_orders(refresh_order_store(source), columns, filters)
+
+
+def iter_canonical(columns=None, batch_size=500_000, source=CANONICAL_FILE):
+    return iter_orders(refresh_order_store(source), columns, batch_size)
+
+
+# --- DASHBOARD SOURCES ---
+# dataset name -> (source file, sheet); CSV sources have no sheet
+DATASETS = {
+    'overview': (STRATEGY_FILE, 'Executive_Overview'),
+    'actions': (STRATEGY_FILE, 'Account_Action_List'),
+    'logic': (STRATEGY_FILE, 'ROI_Logic_Explained'),
+    'summary': (STRATEGY_FILE, 'Phase_Summary'),
+    'coverage': (COVERAGE_FILE, COVERAGE_SHEET),
+    'leakage': (LEAKAGE_FILE, None),
+    'next_call': (NEXT_CALL_FILE, None),
+}
+
+
+def dataset_source(name):
+    return DATASETS[name][0]
+
+
+# One pass over the workbook for all requested sheets instead of re-opening the zip per sheet
+def read_workbook(path, sheets):
+    with span('excel_parse'):
+        return pd.read_excel(path, sheet_name=list(sheets))
+
+
+# Workbooks come back as {sheet: frame} holding every sheet a dataset needs; CSVs as a frame
+def read_source(path):
+    sheets = [sheet for source, sheet in DATASETS.values() if source == path and sheet is not None]
+    if sheets:
+        frames = read_workbook(path, sheets)
+        names = {sheet: name for name, (source, sheet) in DATASETS.items() if source == path}
+        return {sheet: compact(df, names[sheet]) for sheet, df in frames.items()}
+    name = next(name for name, (source, _) in DATASETS.items() if source == path)
+    return compact(pd.read_csv(path), name)
+
+
+def select_dataset(name, data):
+    sheet = DATASETS[name][1]
+    return data if sheet is None else data[sheet]
+
+
+def read_dataset(name):
+    return select_dataset(name, read_source(dataset_source(name)))
+
+
+def load_sources(names=tuple(DATASETS), max_workers=4):
+    # The sources are independent, so they are read side by side. Threads keep this
+    # safe inside the Streamlit server; zip inflation and the CSV parser release the GIL.
+    paths = list(dict.fromkeys(dataset_source(name) for name in names))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        parsed = dict(zip(paths, pool.map(in_render(read_source), paths)))
+    return {name: select_dataset(name, parsed[dataset_source(name)]) for name in names}
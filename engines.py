@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+
+# --- PRODUCT 0: ROI SPEED SCORE ---
+# ROI = (Recent_Activity x 0.4) + (Historical_Revenue x 0.4) + (Coverage_Gap x 0.2), each factor on 0-100
+ROI_WEIGHTS = {'recent_activity': 0.4, 'historical_revenue': 0.4, 'coverage_gap': 0.2}
+RECENT_WINDOW_DAYS = 90
+ROI_COLUMNS = ('customer_id', 'order_date', 'order_value', 'rep_role')
+
+# Same cut-offs as the priority_label column of the strategy workbook
+PRIORITY_THRESHOLDS = ((75, 'High'), (40, 'Medium'))
+
+
+# Percentile of each value within the portfolio (0-100); accounts with nothing score 0
+def _portfolio_percentile(values):
+    pct = pd.Series(values).rank(method='max', pct=True).to_numpy() * 100
+    return np.where(values > 0, pct, 0.0)
+
+
+def roi_speed_scores(orders, phases=None, as_of=None, window_days=RECENT_WINDOW_DAYS):
+    """Score every account in `orders` in one vectorized pass.
+
+    `phases` maps customer_id -> recommended_phase; when given, Phase 1A accounts get the
+    coverage bonus. Without it the bonus goes to accounts with no rep on any order.
+    `as_of` defaults to the latest order date so a stale extract still scores sensibly.
+    """
+    codes, customers = pd.factorize(orders['customer_id'], sort=True)
+    n = len(customers)
+    order_dates = pd.to_datetime(orders['order_date']).to_numpy()
+    as_of = order_dates.max() if as_of is None else np.datetime64(pd.Timestamp(as_of))
+    cutoff = as_of - np.timedelta64(window_days, 'D')
+
+    recent = (order_dates > cutoff) & (order_dates <= as_of)
+    recent_orders = np.bincount(codes[recent], minlength=n)
+    ltv = np.bincount(codes, weights=orders['order_value'].to_numpy(dtype=float), minlength=n)
+
+    if phases is not None:
+        coverage_gap = pd.Index(customers).map(phases).to_numpy() == 'Phase 1A'
+    else:
+        covered_orders = np.bincount(codes, weights=orders['rep_role'].notna().to_numpy(), minlength=n)
+        coverage_gap = covered_orders == 0
+    return _score_frame(customers, recent_orders, ltv, coverage_gap)
+
+
+def roi_scores_from_totals(ltv, recent_orders, phases):
+    """roi_speed_scores from per-customer totals kept up to date elsewhere.
+
+    `ltv` is lifetime revenue by customer_id, one entry per customer with orders;
+    `recent_orders` the order count in the recent window, by customer_id (customers
+    without recent orders may be left out). `phases` is as in roi_speed_scores.
+    """
+    ltv = ltv.sort_index()
+    customers = ltv.index
+    recent = recent_orders.reindex(customers, fill_value=0).to_numpy()
+    coverage_gap = pd.Index(customers).map(phases).to_numpy() == 'Phase 1A'
+    return _score_frame(customers, recent, ltv.to_numpy(dtype=float), coverage_gap)
+
+
+def _score_frame(customers, recent_orders, ltv, coverage_gap):
+    scores = pd.DataFrame({
+        'customer_id': customers,
+        'recent_orders': recent_orders,
+        'ltv': ltv,
+        'recent_activity': _portfolio_percentile(recent_orders),
+        'historical_revenue': _portfolio_percentile(ltv),
+        'coverage_gap': coverage_gap * 100.0,
+    })
+    roi = sum(scores[factor] * weight for factor, weight in ROI_WEIGHTS.items())
+    scores['roi_speed_score'] = roi.round().astype('int64')
+    return scores
+
+
+def priority_labels(scores):
+    scores = np.asarray(scores)
+    return np.select([scores >= cut for cut, _ in PRIORITY_THRESHOLDS],
+                     [label for _, label in PRIORITY_THRESHOLDS], default='Low')
+
+
+# Replace the spreadsheet scores on the action list; accounts without orders keep theirs
+def apply_roi_scores(actions, scores):
+    computed = actions['customer_id'].map(scores.set_index('customer_id')['roi_speed_score'])
+    actions = actions.copy()
+    actions['roi_speed_score'] = computed.fillna(actions['roi_speed_score']).astype('int64')
+    actions['priority_label'] = priority_labels(actions['roi_speed_score'])
+    return actions
+
+
+# --- PRODUCT 2: REVENUE LEAKAGE ---
+# Freq_Drop % = (Baseline Frequency - Current Frequency) / Baseline Frequency
+# Est. Recoverable Rev = (Baseline Monthly $ - Current Monthly $) x 12
+LEAKAGE_COLUMNS = ('customer_id', 'account_name', 'order_date', 'order_value')
+LEAKAGE_SCHEMA = ['customer_id', 'account_name', 'leakage_type', 'reason', 'est_recoverable_revenue']
+BASELINE_MONTHS = 12
+CURRENT_MONTHS = 3
+FREQ_DROP_THRESHOLD = 0.25
+NEXT_CALL_COUNT = 20
+
+
+# Per-customer monthly order counts and revenue, folded one chunk at a time so only
+# the (customer x month) aggregate is ever held, never the raw order lines. Totals are
+# additive: pass the result of an earlier fold to extend it with newer chunks.
+def fold_activity(chunks, totals=None, account_names=None):
+    """Returns (totals, account_names): `totals` has orders and revenue columns indexed by
+    (customer_id, month), `account_names` maps customer_id -> account_name. Both are None
+    when there is nothing to fold."""
+    names = [] if account_names is None else [account_names]
+    for chunk in chunks:
+        month = pd.to_datetime(chunk['order_date']).dt.to_period('M')
+        part = (chunk.assign(month=month)
+                .groupby(['customer_id', 'month'], observed=True)['order_value']
+                .agg(orders='count', revenue='sum'))
+        # Plain string ids, so parts from differently encoded chunks (or a saved fold) line up
+        part.index = part.index.set_levels(part.index.levels[0].astype(str), level='customer_id')
+        totals = part if totals is None else totals.add(part, fill_value=0)
+        pairs = chunk[['customer_id', 'account_name']].drop_duplicates('customer_id').astype(str)
+        names.append(pairs.set_index('customer_id')['account_name'])
+
+    if totals is None:
+        return None, None
+    account_names = pd.concat(names)
+    return totals, account_names[~account_names.index.duplicated(keep='last')]
+
+
+# Dense matrices over a gap-free month axis so column offsets are month offsets.
+# `months` fixes the (first, last) month of the axis instead of taking the data's span.
+def activity_matrix(totals, account_names, months=None):
+    if totals is None:
+        return None, None, pd.Series(dtype=object)
+    first, last = months or (totals.index.get_level_values('month').min(), totals.index.get_level_values('month').max())
+    months = pd.period_range(first, last, freq='M')
+    orders = totals['orders'].unstack('month', fill_value=0).reindex(columns=months, fill_value=0)
+    revenue = totals['revenue'].unstack('month', fill_value=0).reindex(columns=months, fill_value=0)
+    return orders, revenue, account_names
+
+
+def monthly_activity(chunks, months=None):
+    return activity_matrix(*fold_activity(chunks), months=months)
+
+
+# Sum of the `window` months ending at each column (columns before the first full window read 0)
+def _rolling_sum(matrix, window):
+    padded = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    rolled = padded[:, window:] - padded[:, :-window]
+    return np.concatenate([np.zeros((matrix.shape[0], window - 1)), rolled], axis=1)
+
+
+def detect_leakage(chunks, as_of=None, baseline_months=BASELINE_MONTHS, current_months=CURRENT_MONTHS,
+                   threshold=FREQ_DROP_THRESHOLD, months=None):
+    """Flag customers whose monthly order frequency fell `threshold` or more below baseline.
+
+    The current window is the last `current_months` complete months before `as_of`
+    (default: the month of the latest order); the baseline is the `baseline_months` before it,
+    or as many of them as the month axis has, so any history of `current_months` + 1 months
+    can be audited.
+    `months` pins the month axis, so a subset of customers is scored on the same windows
+    as the full history. Returns the revenue_leakage_detector.csv schema, largest
+    recoverable revenue first.
+    """
+    totals, account_names = fold_activity(chunks)
+    return leakage_from_activity(totals, account_names, as_of, baseline_months, current_months, threshold, months)
+
+
+# detect_leakage over totals from fold_activity, e.g. a fold kept up to date as orders arrive
+def leakage_from_activity(totals, account_names, as_of=None, baseline_months=BASELINE_MONTHS,
+                          current_months=CURRENT_MONTHS, threshold=FREQ_DROP_THRESHOLD, months=None):
+    orders, revenue, account_names = activity_matrix(totals, account_names, months)
+    if orders is None:
+        return pd.DataFrame(columns=LEAKAGE_SCHEMA)
+
+    as_of_month = orders.columns[-1] if as_of is None else pd.Period(as_of, freq='M')
+    end = orders.columns.get_indexer([as_of_month - 1])[0]
+    if end < 0:
+        return pd.DataFrame(columns=LEAKAGE_SCHEMA)
+
+    counts, spend = orders.to_numpy(dtype=float), revenue.to_numpy(dtype=float)
+    current_freq = _rolling_sum(counts, current_months)[:, end] / current_months
+    current_spend = _rolling_sum(spend, current_months)[:, end] / current_months
+    baseline_end = end - current_months
+    if baseline_end < 0:
+        return pd.DataFrame(columns=LEAKAGE_SCHEMA)
+    # A history shorter than the full baseline is averaged over the months it has
+    window = min(baseline_months, baseline_end + 1)
+    baseline_freq = _rolling_sum(counts, window)[:, baseline_end] / window
+    baseline_spend = _rolling_sum(spend, window)[:, baseline_end] / window
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        freq_drop = np.where(baseline_freq > 0, (baseline_freq - current_freq) / baseline_freq, 0.0)
+    recoverable = (baseline_spend - current_spend) * 12
+    flagged = (freq_drop >= threshold) & (recoverable > 0)
+
+    customers = orders.index[flagged]
+    leakage = pd.DataFrame({
+        'customer_id': customers,
+        'account_name': customers.map(account_names),
+        'leakage_type': 'Frequency Drop',
+        'reason': pd.Series(np.round(freq_drop[flagged] * 100).astype(int)).astype(str) + '% drop in order frequency',
+        'est_recoverable_revenue': recoverable[flagged],
+    })
+    return leakage.sort_values('est_recoverable_revenue', ascending=False, ignore_index=True)
+
+
+# next_best_call_list.csv: the leakage audit's top recovery targets
+def next_best_calls(leakage, count=NEXT_CALL_COUNT):
+    return leakage.head(count).reset_index(drop=True)
+
+
+# --- PRODUCT 1: COVERAGE GAP ---
+# Piecewise rules from the Coverage Analyzer and Strategy & ROI Logic pages, first match wins:
+#   Critical Gap    no rep and (Phase 1A or ROI > 70)
+#   Under-Serviced  Inside rep and ROI > 70
+#   Over-Serviced   Outside rep and (Phase 3 or ROI < 30)
+# Flags use the coverage_flag vocabulary of mock_day1-2_account_coverage.xlsx
+COVERAGE_FLAGS = {
+    'critical_gap': 'No Coverage',
+    'under_serviced': 'Misaligned (Under-serviced)',
+    'over_serviced': 'Misaligned (Over-serviced)',
+    'aligned': 'Aligned',
+}
+HIGH_ROI = 70
+LOW_ROI = 30
+COVERAGE_SCHEMA = ['customer_id', 'recommended_phase', 'roi_speed_score', 'rep_role', 'coverage_flag']
+
+
+def classify_coverage(actions, assignments):
+    """Flag every account on the action list against its current rep assignment.
+
+    `assignments` holds customer_id and rep_role (Inside / Outside, empty for no rep);
+    accounts missing from it are treated as uncovered.
+    """
+    rep_role = actions['customer_id'].map(assignments.drop_duplicates('customer_id').set_index('customer_id')['rep_role'])
+    phase = actions['recommended_phase'].to_numpy()
+    roi = actions['roi_speed_score'].to_numpy()
+    role = rep_role.to_numpy(dtype=object)
+
+    no_rep = rep_role.isna().to_numpy()
+    conditions = [
+        no_rep & ((phase == 'Phase 1A') | (roi > HIGH_ROI)),
+        (role == 'Inside') & (roi > HIGH_ROI),
+        (role == 'Outside') & ((phase == 'Phase 3') | (roi < LOW_ROI)),
+    ]
+    choices = [COVERAGE_FLAGS['critical_gap'], COVERAGE_FLAGS['under_serviced'], COVERAGE_FLAGS['over_serviced']]
+
+    coverage = actions[['customer_id', 'recommended_phase', 'roi_speed_score']].copy()
+    coverage['rep_role'] = rep_role
+    coverage['coverage_flag'] = np.select(conditions, choices, default=COVERAGE_FLAGS['aligned'])
+    return coverage[COVERAGE_SCHEMA].reset_index(drop=True)
@@ -0,0 +1,91 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from indexes import key_positions
+
+# --- SERVER-SIDE TABLE EXPLORER ---
+# Filtering, sorting and paging happen here so only the visible page is sent to the browser
+
+
+class TableIndex:
+    """Read-only lookup structures over a frame: value -> row positions for each key column,
+    a date-sorted permutation for range filters, and cached sort orders per column."""
+
+    def __init__(self, df, keys=(), date_column=None):
+        self.df = df.reset_index(drop=True)
+        self.size = len(self.df)
+        self.postings = {col: key_positions(self.df[col]) for col in keys}
+        self.date_column = date_column
+        if date_column:
+            dates = self.df[date_column].to_numpy()
+            self.date_order = np.argsort(dates, kind='stable')
+            self.sorted_dates = dates[self.date_order]
+        self._sort_orders = {}
+        self._options = {}
+
+    def options(self, col):
+        if col not in self._options:
+            self._options[col] = sorted(self.postings[col], key=str)
+        return self._options[col]
+
+    def search_options(self, col, text, limit=50):
+        # Values of `col` containing `text` (case-insensitive), for pickers too long to send whole
+        needle = text.strip().lower()
+        hits = (value for value in self.options(col) if needle in str(value).lower())
+        return list(itertools.islice(hits, limit))
+
+    def date_bounds(self):
+        return self.sorted_dates[0], self.sorted_dates[-1]
+
+    def _postings_union(self, col, values):
+        hits = [self.postings[col][value] for value in values if value in self.postings[col]]
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.intp)
+
+    def select(self, equals=None, search=None, date_range=None):
+        """Row positions matching every filter; empty/None filters are ignored.
+
+        equals:     {column: [values]}, rows whose value is any of them
+        search:     {column: text}, case-insensitive substring over the column's distinct values
+        date_range: (start, end) inclusive, on the index's date column
+        """
+        candidates = []
+        for col, values in (equals or {}).items():
+            if values:
+                candidates.append(self._postings_union(col, values))
+        for col, text in (search or {}).items():
+            if text:
+                needle = text.lower()
+                candidates.append(self._postings_union(col, [v for v in self.postings[col] if needle in str(v).lower()]))
+        if date_range and self.date_column:
+            start, end = (np.datetime64(pd.Timestamp(bound)) for bound in date_range)
+            lo = np.searchsorted(self.sorted_dates, start, side='left')
+            hi = np.searchsorted(self.sorted_dates, end + np.timedelta64(1, 'D'), side='left')
+            candidates.append(self.date_order[lo:hi])
+
+        if not candidates:
+            return np.arange(self.size)
+        mask = np.ones(self.size, dtype=bool)
+        for positions in candidates:
+            hit = np.zeros(self.size, dtype=bool)
+            hit[positions] = True
+            mask &= hit
+        return np.flatnonzero(mask)
+
+    def sort_order(self, col, ascending=True):
+        # Positions in sorted order (missing values last), computed once per column and direction
+        if (col, ascending) not in self._sort_orders:
+            ordered = self.df[col].sort_values(ascending=ascending, kind='stable', na_position='last')
+            self._sort_orders[col, ascending] = ordered.index.to_numpy()
+        return self._sort_orders[col, ascending]
+
+    def page(self, positions, sort_by=None, ascending=True, page=1, page_size=50):
+        # Returns (rows for `page`, total matching rows); page numbers start at 1
+        if sort_by:
+            selected = np.zeros(self.size, dtype=bool)
+            selected[positions] = True
+            order = self.sort_order(sort_by, ascending)
+            positions = order[selected[order]]
+        start = (page - 1) * page_size
+        return self.df.iloc[positions[start:start + page_size]], len(positions)
@@ -0,0 +1,140 @@
+import copy
+import heapq
+import itertools
+import threading
+from bisect import bisect_left, insort
+
+import numpy as np
+import pandas as pd
+
+# --- ACCOUNT INDEXES ---
+MISSING = '(none)'
+
+
+def key_positions(column):
+    """value -> row positions of `column`, built with one factorize; missing values map to MISSING."""
+    codes, uniques = pd.factorize(column, use_na_sentinel=False)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+    labels = [MISSING if pd.isna(value) else value for value in uniques]
+    return dict(zip(labels, np.split(order, bounds)))
+
+
+class PhaseIndex:
+    """Action list partitioned by phase, each partition kept sorted by ROI score (highest first).
+
+    Partitions hold (-score, customer_id) keys, so a phase's top N is a slice and the
+    portfolio top N is a heap merge of the partitions. An index is never modified once
+    built; `with_actions` derives the index of a new scores version, moving only the
+    accounts whose score changed when few did. Rendered partition frames are cached per index.
+    """
+
+    # Above this share of changed scores, re-sorting beats moving keys one by one
+    REBUILD_FRACTION = 0.05
+
+    def __init__(self, actions, phase_col='recommended_phase', score_col='roi_speed_score', key='customer_id',
+                 version=None):
+        self.phase_col, self.score_col, self.key = phase_col, score_col, key
+        self.version = version
+        self._lock = threading.Lock()
+        self._build(self._records(actions))
+
+    def _records(self, actions):
+        records = actions.set_index(self.key, drop=False)
+        records.index = records.index.astype(str)
+        return records
+
+    def _build(self, records):
+        self.records = records
+        self._keys = {}
+        for phase, group in records.groupby(self.phase_col, observed=True, sort=True):
+            self._keys[phase] = sorted(zip((-group[self.score_col]).tolist(), group.index))
+        self._frames = {}
+
+    def _changed_scores(self, incoming):
+        # Changed accounts as (customer_id, old, new) when only scores moved; None if a rebuild is needed
+        if not incoming.index.sort_values().equals(self.records.index.sort_values()):
+            return None
+        current = self.records.reindex(incoming.index)
+        if not (incoming[self.phase_col].astype(str) == current[self.phase_col].astype(str)).all():
+            return None
+        old, new = current[self.score_col].to_numpy(), incoming[self.score_col].to_numpy()
+        moved = old != new
+        if moved.sum() > len(incoming) * self.REBUILD_FRACTION:
+            return None
+        return list(zip(incoming.index[moved], old[moved].tolist(), new[moved].tolist()))
+
+    def with_actions(self, actions, version=None):
+        """A new index over `actions` (tagged `version`); this one is left untouched.
+
+        Partitions without a changed score are shared with this index, the others are
+        copied and the changed keys moved with bisect.
+        """
+        index = copy.copy(self)
+        index.version = version
+        index._lock = threading.Lock()
+        incoming = self._records(actions)
+        changed = self._changed_scores(incoming)
+        if changed is None:
+            index._build(incoming)
+            return index
+
+        index.records, index._frames = incoming, {}
+        index._keys = dict(self._keys)
+        touched = set()
+        for cid, old_score, new_score in changed:
+            phase = incoming.at[cid, self.phase_col]
+            if phase not in touched:
+                index._keys[phase] = list(index._keys[phase])
+                touched.add(phase)
+            keys = index._keys[phase]
+            del keys[bisect_left(keys, (-old_score, cid))]
+            insort(keys, (-new_score, cid))
+        return index
+
+    def phases(self):
+        return list(self._keys)
+
+    def phase(self, phase):
+        # Full partition, best score first
+        with self._lock:
+            if phase not in self._frames:
+                self._frames[phase] = self.records.loc[[cid for _, cid in self._keys.get(phase, [])]]
+            return self._frames[phase]
+
+    def top(self, n, phase=None):
+        if phase is not None:
+            keys = self._keys.get(phase, [])[:n]
+        else:
+            keys = itertools.islice(heapq.merge(*self._keys.values()), n)
+        return self.records.loc[[cid for _, cid in keys]]
+
+
+class AccountIndex:
+    """customer_id -> row positions in every source, so an account's full picture is
+    gathered with positional takes instead of scanning each frame."""
+
+    def __init__(self, sources, key='customer_id', name_col='account_name'):
+        self.sources = {name: df.reset_index(drop=True) for name, df in sources.items()}
+        self.positions = {name: {str(cid): rows for cid, rows in key_positions(df[key]).items()}
+                          for name, df in self.sources.items()}
+
+        # "CUST_001 — Account Name" labels for search, one per account
+        names = {}
+        for df in self.sources.values():
+            if name_col in df:
+                pairs = df[[key, name_col]].drop_duplicates(key)
+                names.update(zip(pairs[key].astype(str), pairs[name_col].astype(str)))
+        self.labels = {cid: f"{cid} — {name}" for cid, name in sorted(names.items())}
+
+    def search(self, text, limit=50):
+        needle = text.strip().lower()
+        hits = (cid for cid, label in self.labels.items() if needle in label.lower())
+        return list(itertools.islice(hits, limit))
+
+    def lookup(self, customer_id):
+        # {source name: matching rows}; sources without the account give an empty frame
+        customer_id = str(customer_id)
+        empty = np.empty(0, dtype=np.intp)
+        return {name: df.iloc[self.positions[name].get(customer_id, empty)]
+                for name, df in self.sources.items()}
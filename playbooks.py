@@ -0,0 +1,172 @@
+import csv
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from data_loader import CACHE_DIR, write_atomic
+
+# --- PRODUCT 3: PLAYBOOK TEMPLATES ---
+# Each section is (column, heading, script, logic); [Bracketed] words are filled per account
+PLAYBOOKS = {
+    'Phase 1A': {
+        'strategy': "Strategy: The Service Upgrade (Active / No Coverage)",
+        'intent': "**Intent:** Transition transactional web-buyers into managed accounts to prevent shopping around.",
+        'note': "**Note for Reps:** This account is active but undefended. Focus on engagement and consistency.",
+        'sections': [
+            ('call_opening', "1. Call Opening",
+             "“I’m calling from the Account Strategy team. I was reviewing your account activity—specifically your consistent orders in [Category]—and I realized that despite your volume, you don't currently have a dedicated specialist assigned to you. I’m calling to bridge that gap and ensure you have a direct line for project pricing and inventory flags.”",
+             "**The Logic:** Links call to actual behavior. Pivots from 'sales' to a 'service upgrade.'"),
+            ('discovery', "2. Discovery Questions",
+             "“Since you’re currently placing these orders through the portal, what is the one thing about our lead-time communication that slows your team down? Also, who else on your team is authorized to pull technical specs? I want to make sure they have the same direct access I'm providing you.”",
+             "**The Logic:** Uncovers changes in needs and identifies other stakeholders (Expansion)."),
+            ('objection_handling', "3. Objection Handling (Pushback: 'We're all set/The website is fine')",
+             "“I’m glad the portal is working well—it’s designed for speed. My goal isn’t to change HOW you buy, but to change WHAT you pay. I can flag volume discounts or stock shortages before you even hit 'checkout' on the site.”",
+             "**The Logic:** Acknowledge → Reframe. Adds a layer of value the automated system cannot provide."),
+            ('prompt', "4. Cross-Sell Prompt",
+             "“Most clients moving your volume of [Primary Category] are also seeing a 15% savings by bundling their [Adjacent Category] requirements. Would you like a price-comparison on your next bundle?”",
+             "**The Logic:** Logic-based expansion framed as 'streamlining' efficiency."),
+            ('follow_up_email', "5. Follow-Up Email",
+             "**Subject:** Direct Contact for [Account Name] | Project Pricing\n\n“Great speaking today. I’ve attached my direct line and a summary of the volume pricing tiers for [Category] we talked about. Next time you have a project over $5k, shoot me the SKU list before you buy so I can check for additional savings.”",
+             None),
+        ],
+    },
+    'Phase 1B': {
+        'strategy': "Strategy: The Diagnostic Recovery (Dormant / Declined)",
+        'intent': "**Intent:** Re-engage historically significant accounts by uncovering the 'Silent No' (the reason they left).",
+        'note': "**Note for Reps:** This account requires re-engagement. Focus on recovery and trust-building.",
+        'sections': [
+            ('call_opening', "1. Call Opening",
+             "“I was looking at your historical project history and noticed a significant shift. We used to partner closely on [Category] projects, but it’s been about nine months since our last order. Usually, when a partner of your size stops ordering, it’s because we either missed a beat on service or a competitor moved the goalposts. I’m calling to see which one it was.”",
+             "**The Logic:** Radical transparency. Acknowledges the gap in time to build immediate trust."),
+            ('discovery', "2. Diagnostic Discovery",
+             "“When you moved that volume away, was it driven by a specific service failure, or did a competitor offer a specific capability we were lacking? If I could provide a 'shadow quote' on your next project—just to give you a baseline to keep your current supplier honest—would you be open to that?”",
+             "**The Logic:** Diagnostic focus. Intelligence gathering over selling."),
+            ('objection_handling', "3. Objection Handling (Pushback: 'We have a new supplier')",
+             "“I respect that. Stability is important. I’m not asking you to fire them; I’m asking to be your 'Plan B.' If they have a stock-out or a price hike, you shouldn't have to start from scratch. Let’s keep your account active as a safety net.”",
+             "**The Logic:** Acknowledge and Reframe. Positions the rep as a useful 'Plan B' backup."),
+            ('prompt', "4. Evolution Prompt",
+             "“Since we last worked together, we’ve overhauled our [New Product Line]. Based on your previous specs, these might actually solve the [Old Pain Point] we discussed last year. Would you like the new spec sheet?”",
+             "**The Logic:** Shows 'things have changed' since they left, giving them a reason to look again."),
+            ('follow_up_email', "5. Follow-Up Email",
+             "**Subject:** Following up / Project History [Account Name]\n\n“Thanks for the candid feedback. I've noted your comments regarding [Reason for Leaving]. I’ve attached our updated 2024 catalog. Even if you're set with your current supplier, I'd appreciate the chance to bid on your next 'rush' order just to show you the improvements we've made.”",
+             None),
+        ],
+    },
+}
+ACCOUNT_COLUMNS = ['customer_id', 'account_name', 'recommended_phase', 'roi_speed_score']
+ORDER_COLUMNS = ('customer_id', 'category', 'order_value')  # order history columns the contexts read
+SECTION_COLUMNS = [column for column, *_ in PLAYBOOKS['Phase 1A']['sections']]
+PLAYBOOK_DIR = os.path.join(CACHE_DIR, 'playbooks')
+CHUNK_SIZE = 5000  # accounts per worker task; a single chunk (or CPU) is rendered in-process
+
+_playbook_lock = threading.Lock()
+
+
+# "[Account Name]" -> "{Account Name}" with literal braces escaped, so filling is one format_map
+def compile_template(text):
+    escaped = text.replace('{', '{{').replace('}', '}}')
+    return re.sub(r'\[([A-Za-z ]+)\]', r'{\1}', escaped)
+
+
+# Templates are compiled once at import, in the page process and in every worker
+TEMPLATES = {phase: [(column, compile_template(script)) for column, _, script, _ in playbook['sections']]
+             for phase, playbook in PLAYBOOKS.items()}
+
+
+class _Placeholders(dict):
+    # Fields the account has no data for stay visible as "[Field]" for the rep to fill in
+    def __missing__(self, key):
+        return f"[{key}]"
+
+
+def render_playbook(context):
+    """{section column: script} for one account; `context` needs recommended_phase plus any placeholder values."""
+    fields = _Placeholders({key: value for key, value in context.items() if isinstance(value, str) and value})
+    return {column: template.format_map(fields) for column, template in TEMPLATES[context['recommended_phase']]}
+
+
+def _render_rows(records):
+    return [[record[col] for col in ACCOUNT_COLUMNS] + list(render_playbook(record).values()) for record in records]
+
+
+def playbook_contexts(actions, orders, leakage):
+    """One row per Phase 1A/1B account with the values its playbook placeholders take.
+
+    [Category]/[Primary Category] is the account's top category by revenue and [Adjacent Category]
+    its second; [Reason for Leaving] is the leakage reason. Rows are ordered best ROI first.
+    """
+    targets = actions[actions['recommended_phase'].isin(list(PLAYBOOKS))]
+    contexts = targets[ACCOUNT_COLUMNS].astype({'customer_id': str, 'account_name': str, 'recommended_phase': str})
+    contexts = contexts.sort_values('roi_speed_score', ascending=False, kind='stable', ignore_index=True)
+
+    revenue = (orders.groupby(['customer_id', 'category'], observed=True)['order_value'].sum()
+               .sort_values(ascending=False, kind='stable').reset_index())
+    revenue['rank'] = revenue.groupby('customer_id', observed=True).cumcount()
+    top = revenue[revenue['rank'] < 2].astype({'customer_id': str, 'category': str})
+    top = top.pivot(index='customer_id', columns='rank', values='category')
+    reasons = leakage.astype({'customer_id': str}).drop_duplicates('customer_id').set_index('customer_id')['reason']
+
+    contexts['Category'] = contexts['customer_id'].map(top.get(0, pd.Series(dtype=object)))
+    contexts['Primary Category'] = contexts['Category']
+    contexts['Adjacent Category'] = contexts['customer_id'].map(top.get(1, pd.Series(dtype=object)))
+    contexts['Account Name'] = contexts['account_name']
+    contexts['Reason for Leaving'] = contexts['customer_id'].map(reasons.astype(str))
+    return contexts.astype(object).where(contexts.notna(), None)
+
+
+def write_playbooks(contexts, path, workers=None, chunk_size=CHUNK_SIZE):
+    """Render a call sheet per account in `contexts` and stream them to a CSV at `path`.
+
+    Chunks are rendered in a process pool and written in order as they come back, so
+    only a few chunks are in memory at once. Returns the number of accounts written.
+    """
+    records = contexts.to_dict('records')
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+
+    def write(target):
+        with open(target, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(ACCOUNT_COLUMNS + SECTION_COLUMNS)
+            if workers <= 1:
+                for chunk in chunks:
+                    writer.writerows(_render_rows(chunk))
+                return
+            # Spawned workers, so the pool is safe to start from the threaded app server
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                for rows in pool.map(_render_rows, chunks):
+                    writer.writerows(rows)
+
+    write_atomic(path, write)
+    return len(records)
+
+
+# Call sheets are written once per input version and reused until the inputs change
+def playbook_file(contexts, version, root=PLAYBOOK_DIR):
+    """Path of the call sheets CSV for `version`, rendering it first if it is not there yet.
+
+    Callers must hold _playbook_lock until they are done reading the file: generation is
+    serialized so concurrent downloads share one write, and finished files of other
+    versions are only removed while no one is reading them.
+    """
+    name = f"call_sheets-{hashlib.sha256(repr(version).encode()).hexdigest()[:16]}.csv"
+    path = os.path.join(root, name)
+    if not os.path.exists(path):
+        os.makedirs(root, exist_ok=True)
+        for stale in os.listdir(root):
+            if stale.startswith('call_sheets-') and stale.endswith('.csv') and stale != name:
+                os.remove(os.path.join(root, stale))
+        write_playbooks(contexts, path)
+    return path
+
+
+def playbook_bytes(contexts, version, root=PLAYBOOK_DIR):
+    # The call sheets CSV for `version`, for a download button
+    with _playbook_lock:
+        with open(playbook_file(contexts, version, root), 'rb') as f:
+            return f.read()
@@ -0,0 +1,288 @@
+import math
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from data_loader import CACHE_DIR, dump_json, iter_orders, locked, read_json, read_orders, write_atomic
+from engines import LEAKAGE_COLUMNS, fold_activity
+from indexes import MISSING
+
+# --- CANONICAL DATASET ROLLUPS ---
+# category x month x account totals plus the per-chart marginals, all additive so new
+# orders are folded in by aggregating only the partitions appended since the last refresh
+ROLLUP_COLUMNS = ('account_name', 'order_date', 'order_value', 'category', 'margin')
+ROLLUP_DIR = os.path.join(CACHE_DIR, 'rollups')
+MARGIN_BINS = 50  # target bin count when the margin bin width is first fixed
+
+
+# Round bin widths to 1/2/5 x 10^k so they stay readable and fixed across refreshes
+def _nice_width(span, bins=MARGIN_BINS):
+    raw = span / bins if span > 0 else 1.0
+    magnitude = 10 ** math.floor(math.log10(raw))
+    return next(step * magnitude for step in (1, 2, 5, 10) if raw <= step * magnitude)
+
+
+class RollupCube:
+    TABLES = ('cube', 'by_category', 'by_month', 'by_account', 'margin_bins')
+
+    def __init__(self, tables, margin_width, watermark=None, order_count=0, base=None, sequence=None):
+        self.tables = tables
+        self.margin_width = margin_width
+        self.watermark = watermark
+        self.order_count = order_count
+        # Order store the totals cover: the workbook content it was seeded from and its last append
+        self.base, self.sequence = base, sequence
+
+    @classmethod
+    def build(cls, orders, base=None, sequence=None):
+        span = orders['margin'].max() - orders['margin'].min() if len(orders) else 0
+        empty = {name: None for name in cls.TABLES}
+        return cls(empty, _nice_width(span), base=base).apply(orders, sequence)
+
+    def _aggregate(self, orders):
+        month = orders['order_date'].dt.to_period('M').dt.to_timestamp().rename('order_date')
+        bins = (orders['margin'].dropna() // self.margin_width).astype('int64').rename('margin_bin')
+        cube = orders.groupby(['category', month, 'account_name'], observed=True).agg(
+            order_value=('order_value', 'sum'), margin=('margin', 'sum'), orders=('order_value', 'count'))
+        return {
+            'cube': cube,
+            'by_category': cube.groupby(level='category', observed=True)[['order_value']].sum(),
+            'by_month': cube.groupby(level='order_date')[['order_value']].sum(),
+            'by_account': cube.groupby(level='account_name', observed=True)[['order_value']].sum(),
+            'margin_bins': bins.value_counts().rename('count').to_frame(),
+        }
+
+    def apply(self, delta, sequence=None):
+        # Returns a new cube so a cached instance is never mutated under a reader
+        if delta.empty:
+            return RollupCube(self.tables, self.margin_width, self.watermark, self.order_count, self.base, sequence)
+        parts = self._aggregate(delta)
+        tables = {name: part if self.tables[name] is None else self.tables[name].add(part, fill_value=0)
+                  for name, part in parts.items()}
+        watermark = delta['order_date'].max()
+        if self.watermark is not None:
+            watermark = max(watermark, self.watermark)
+        return RollupCube(tables, self.margin_width, watermark, self.order_count + len(delta), self.base, sequence)
+
+    # --- chart queries (shaped like the groupby results the page used to build) ---
+    def category_revenue(self):
+        return self.tables['by_category'].reset_index()
+
+    def monthly_revenue(self):
+        by_month = self.tables['by_month']['order_value'].sort_index()
+        if by_month.empty:
+            return by_month.reset_index()
+        months = pd.date_range(by_month.index.min(), by_month.index.max(), freq='MS', name='order_date')
+        return by_month.reindex(months, fill_value=0).reset_index()
+
+    def top_accounts(self, n=10):
+        return self.tables['by_account']['order_value'].nlargest(n).reset_index()
+
+    def margin_histogram(self):
+        counts = self.tables['margin_bins']['count'].sort_index()
+        return pd.DataFrame({'bin_start': counts.index * self.margin_width,
+                             'bin_end': (counts.index + 1) * self.margin_width,
+                             'count': counts.to_numpy().astype('int64')})
+
+    # --- persistence: each save goes to a fresh directory, then CURRENT is swapped atomically ---
+    def save(self, root=ROLLUP_DIR):
+        version = f"{(self.base or '')[:12]}-{pd.Timestamp(self.watermark):%Y%m%d%H%M%S}-{self.order_count}"
+        target = os.path.join(root, version)
+        os.makedirs(target, exist_ok=True)
+        for name, table in self.tables.items():
+            write_atomic(os.path.join(target, f"{name}.parquet"), lambda p, table=table: table.to_parquet(p))
+
+        meta = {'version': version, 'margin_width': self.margin_width,
+                'watermark': pd.Timestamp(self.watermark).isoformat(), 'order_count': self.order_count,
+                'base': self.base, 'sequence': self.sequence}
+        current = os.path.join(root, 'CURRENT.json')
+        previous = read_json(current)
+        write_atomic(current, lambda p: dump_json(meta, p))
+        if previous and previous['version'] != version:
+            shutil.rmtree(os.path.join(root, previous['version']), ignore_errors=True)
+
+    @classmethod
+    def load(cls, root=ROLLUP_DIR):
+        meta = read_json(os.path.join(root, 'CURRENT.json'))
+        if not meta:
+            return None
+        try:
+            tables = {name: pd.read_parquet(os.path.join(root, meta['version'], f"{name}.parquet"))
+                      for name in cls.TABLES}
+        except (OSError, ValueError):  # half-written or removed under us: rebuilt by the caller
+            return None
+        return cls(tables, meta['margin_width'], pd.Timestamp(meta['watermark']), meta['order_count'], meta.get('base'),
+                   meta.get('sequence'))
+
+
+def refresh_rollups(manifest, root=ROLLUP_DIR):
+    """The rollups of the order store as `manifest` describes it, bringing the persisted
+    ones up to date by reading only the partitions appended since they were saved (late
+    orders included, whatever their date).
+
+    They are rebuilt from scratch when the order store was re-seeded from different
+    workbook content. A manifest older than the persisted rollups (a snapshot still being
+    built after the store moved on) gets its own build, which is not saved.
+    """
+    # One refresh at a time, across processes too: a save never lands under another's load
+    with locked(root):
+        cube = RollupCube.load(root)
+        if cube is not None and cube.base == manifest['base'] and cube.sequence is not None:
+            if cube.sequence == manifest['sequence']:
+                return cube
+            if cube.sequence < manifest['sequence']:
+                cube = cube.apply(read_orders(manifest, ROLLUP_COLUMNS, after=cube.sequence), manifest['sequence'])
+                cube.save(root)
+                return cube
+            return RollupCube.build(read_orders(manifest, ROLLUP_COLUMNS), manifest['base'], manifest['sequence'])
+
+        cube = RollupCube.build(read_orders(manifest, ROLLUP_COLUMNS), manifest['base'], manifest['sequence'])
+        if cube.watermark is not None:
+            cube.save(root)
+        return cube
+
+
+# --- CUSTOMER ACTIVITY ---
+# Per-customer monthly order counts and revenue (engines.fold_activity) for the ROI scores
+# and the leakage audit. The totals are additive, so like the rollups they are persisted
+# and only the partitions appended since are folded in.
+ACTIVITY_DIR = os.path.join(CACHE_DIR, 'activity')
+
+
+class CustomerActivity:
+    def __init__(self, totals, account_names, base=None, sequence=None):
+        self.totals, self.account_names = totals, account_names
+        self.base, self.sequence = base, sequence
+
+    def apply(self, chunks, sequence=None):
+        # A new instance; this one may be in use by a reader
+        totals, account_names = fold_activity(chunks, self.totals, self.account_names)
+        return CustomerActivity(totals, account_names, self.base, sequence)
+
+    def ltv(self):
+        # Lifetime revenue by customer_id
+        if self.totals is None:
+            return pd.Series(dtype=float)
+        return self.totals['revenue'].groupby(level='customer_id').sum()
+
+    @property
+    def nbytes(self):
+        if self.totals is None:
+            return 0
+        return int(self.totals.memory_usage(deep=True).sum() + self.account_names.memory_usage(deep=True))
+
+    # Persisted like the rollups: a fresh directory per version, then CURRENT is swapped
+    def save(self, root=ACTIVITY_DIR):
+        version = f"{(self.base or '')[:12]}-{self.sequence}"
+        target = os.path.join(root, version)
+        os.makedirs(target, exist_ok=True)
+        totals = self.totals.reset_index()
+        totals['month'] = totals['month'].dt.to_timestamp()
+        names = self.account_names.rename_axis('customer_id').reset_index()
+        write_atomic(os.path.join(target, 'totals.parquet'), lambda p: totals.to_parquet(p, index=False))
+        write_atomic(os.path.join(target, 'account_names.parquet'), lambda p: names.to_parquet(p, index=False))
+
+        meta = {'version': version, 'base': self.base, 'sequence': self.sequence}
+        current = os.path.join(root, 'CURRENT.json')
+        previous = read_json(current)
+        write_atomic(current, lambda p: dump_json(meta, p))
+        if previous and previous['version'] != version:
+            shutil.rmtree(os.path.join(root, previous['version']), ignore_errors=True)
+
+    @classmethod
+    def load(cls, root=ACTIVITY_DIR):
+        meta = read_json(os.path.join(root, 'CURRENT.json'))
+        if not meta:
+            return None
+        try:
+            totals = pd.read_parquet(os.path.join(root, meta['version'], 'totals.parquet'))
+            names = pd.read_parquet(os.path.join(root, meta['version'], 'account_names.parquet'))
+        except (OSError, ValueError):
+            return None
+        totals['month'] = totals['month'].dt.to_period('M')
+        return cls(totals.set_index(['customer_id', 'month']), names.set_index('customer_id')['account_name'],
+                   meta['base'], meta['sequence'])
+
+
+def refresh_activity(manifest, root=ACTIVITY_DIR):
+    """The customer activity of the order store as `manifest` describes it, folding in only
+    partitions appended since it was saved; rebuilt when the store was re-seeded, and built
+    without saving for a manifest older than the saved activity."""
+    with locked(root):
+        activity = CustomerActivity.load(root)
+        save = True
+        if activity is None or activity.base != manifest['base'] or activity.sequence is None:
+            activity, after = CustomerActivity(None, None, manifest['base']), None
+        elif activity.sequence == manifest['sequence']:
+            return activity
+        elif activity.sequence < manifest['sequence']:
+            after = activity.sequence
+        else:
+            activity, after, save = CustomerActivity(None, None, manifest['base']), None, False
+        activity = activity.apply(iter_orders(manifest, LEAKAGE_COLUMNS, after=after), manifest['sequence'])
+        if save and activity.totals is not None:
+            activity.save(root)
+        return activity
+
+
+# --- FILTERED SLICES ---
+# The Canonical Dataset sidebar filters: an inclusive (start, end) date range and
+# {column: values} for category, rep_role and account_name. They are evaluated by a
+# pyarrow dataset scan over an in-memory Arrow copy of the orders, built once per version.
+SLICE_COLUMNS = ROLLUP_COLUMNS + ('rep_role',)
+
+
+def order_table(orders):
+    # Categorical columns become dictionary arrays over the same codes, so filters compare integers
+    return pa.Table.from_pandas(orders[list(SLICE_COLUMNS)], preserve_index=False)
+
+
+def _isin(col, values):
+    # MISSING, the explorer's label for an empty value, matches nulls
+    present = [value for value in values if value != MISSING]
+    if MISSING not in values:
+        return ds.field(col).isin(present)
+    return ds.field(col).is_null() | ds.field(col).isin(present) if present else ds.field(col).is_null()
+
+
+def order_filter(date_range=None, equals=None):
+    """pyarrow.dataset expression for the filters, or None when there are none."""
+    conditions = [_isin(col, values) for col, values in (equals or {}).items() if values]
+    if date_range:
+        start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+        conditions += [ds.field('order_date') >= start, ds.field('order_date') < end]
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _totals(key, values, order_value):
+    totals = pa.table({key: values, 'order_value': order_value}).group_by(key).aggregate([('order_value', 'sum')])
+    return totals.to_pandas().set_index(key).rename(columns={'order_value_sum': 'order_value'})
+
+
+def filtered_rollups(table, margin_width, date_range=None, equals=None):
+    """RollupCube answering the chart queries for the orders in `table` (see order_table) that match the filters.
+
+    The filter and the column projection are pushed into the dataset scanner, and the
+    per-chart totals are grouped in Arrow, so no pandas pass over the orders is made.
+    Margin bins keep the full cube's `margin_width`, so a slice's histogram lines up with
+    the unfiltered one. The slice has no category x month x account cube and cannot `apply`.
+    """
+    matched = ds.dataset(table).to_table(columns=list(ROLLUP_COLUMNS), filter=order_filter(date_range, equals))
+    value = matched['order_value']
+    bins = pc.cast(pc.floor(pc.divide(pc.cast(pc.drop_null(matched['margin']), pa.float64()), margin_width)), pa.int64())
+    counts = pa.table({'margin_bin': bins}).group_by('margin_bin').aggregate([('margin_bin', 'count')]).to_pandas()
+    tables = {
+        'cube': None,
+        'by_category': _totals('category', matched['category'], value),
+        'by_month': _totals('order_date', pc.floor_temporal(matched['order_date'], unit='month'), value),
+        'by_account': _totals('account_name', matched['account_name'], value),
+        'margin_bins': counts.set_index('margin_bin').rename(columns={'margin_bin_count': 'count'}),
+    }
+    return RollupCube(tables, margin_width, order_count=matched.num_rows)
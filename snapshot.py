@@ -0,0 +1,289 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from data_loader import (DATASETS, compact, dataset_source, load_sources, read_orders, refresh_order_store,
+                         source_version)
+from engines import (RECENT_WINDOW_DAYS, apply_roi_scores, classify_coverage, leakage_from_activity, next_best_calls,
+                     roi_scores_from_totals)
+from playbooks import ORDER_COLUMNS
+from rollups import order_table, refresh_activity, refresh_rollups
+from telemetry import finish_render, record_hit, span, start_render
+
+# --- SHARED DATA SNAPSHOTS ---
+# One read-only copy of every frame the dashboard serves, shared by all sessions. Each
+# entry is built the first time any session asks for it and then kept for the version.
+# A background thread publishes the next version when the sources move, rebuilding the
+# entries sessions were using off to the side; sessions keep reading the version they
+# started on until they move to the new one.
+REFRESH_INTERVAL = 60  # seconds between checks of the source fingerprints
+MEMORY_BUDGET = 1 << 30  # bytes held across retained versions before the oldest are evicted
+
+
+# --- SNAPSHOT ENTRIES ---
+# Each builder gets the snapshot (to read other entries) and returns {name: value} for
+# every entry it produces; a workbook's sheets come out of one parse together. Order data
+# is read as of the manifest captured with the fingerprint: only the refresher ingests
+# drops, so a snapshot never mixes in orders appended after it was fingerprinted.
+def _source_builder(names):
+    def build(snapshot):
+        with span('load'):
+            return load_sources(names)
+    return build
+
+
+def _orders(snapshot):
+    # Every column, for the explorer and Account 360; engines read their own projections
+    with span('load'):
+        return {'orders': read_orders(snapshot.fingerprint['manifest'])}
+
+
+def _order_table(snapshot):
+    with span('load'):
+        return {'order_table': order_table(snapshot['orders'])}
+
+
+def _rollups(snapshot):
+    with span('aggregate'):
+        return {'rollups': refresh_rollups(snapshot.fingerprint['manifest'])}
+
+
+def _rejected_drops(snapshot):
+    return {'rejected_drops': dict(snapshot.fingerprint['rejected_drops'])}
+
+
+def _playbook_orders(snapshot):
+    with span('load'):
+        return {'playbook_orders': read_orders(snapshot.fingerprint['manifest'], ORDER_COLUMNS)}
+
+
+def _activity(snapshot):
+    # Persisted customer x month totals; only partitions appended since the last refresh are read
+    with span('aggregate'):
+        return {'activity': refresh_activity(snapshot.fingerprint['manifest'])}
+
+
+def _scored_actions(snapshot):
+    # Lifetime revenue comes from the activity totals; only the recent window's orders are read
+    actions, activity = snapshot['actions'], snapshot['activity']
+    manifest = snapshot.fingerprint['manifest']
+    with span('load'):
+        cutoff = pd.Timestamp(manifest['watermark']) - pd.Timedelta(days=RECENT_WINDOW_DAYS)
+        recent = read_orders(manifest, ['customer_id', 'order_date'], filters=[('order_date', '>', cutoff)], since=cutoff)
+    with span('aggregate'):
+        recent_orders = recent['customer_id'].astype(str).value_counts()
+        phases = actions.set_index('customer_id')['recommended_phase']
+        scores = roi_scores_from_totals(activity.ltv(), recent_orders, phases)
+        return {'scored_actions': apply_roi_scores(actions, scores)}
+
+
+def _leakage(snapshot):
+    activity = snapshot['activity']
+    with span('aggregate'):
+        leakage = compact(leakage_from_activity(activity.totals, activity.account_names), 'leakage_audit')
+        return {'leakage_audit': leakage, 'next_call_list': next_best_calls(leakage)}
+
+
+def _coverage_audit(snapshot):
+    scored, coverage = snapshot['scored_actions'], snapshot['coverage']
+    with span('aggregate'):
+        return {'coverage_audit': compact(classify_coverage(scored, coverage), 'coverage_audit')}
+
+
+def _entries():
+    # name -> (fingerprint keys the entry is derived from, builder)
+    entries = {}
+    for path in dict.fromkeys(dataset_source(name) for name in DATASETS):
+        names = [name for name in DATASETS if dataset_source(name) == path]
+        entries.update({name: ((path,), _source_builder(names)) for name in names})
+    actions, coverage = dataset_source('actions'), dataset_source('coverage')
+    entries.update({
+        'orders': (('orders',), _orders),
+        'order_table': (('orders',), _order_table),
+        'rollups': (('orders',), _rollups),
+        'rejected_drops': (('rejected_drops',), _rejected_drops),
+        'playbook_orders': (('orders',), _playbook_orders),
+        'activity': (('orders',), _activity),
+        'scored_actions': (('orders', actions), _scored_actions),
+        'leakage_audit': (('orders',), _leakage),
+        'next_call_list': (('orders',), _leakage),
+        'coverage_audit': (('orders', actions, coverage), _coverage_audit),
+    })
+    return entries
+
+
+ENTRIES = _entries()
+
+
+def snapshot_fingerprint():
+    # Source file versions plus the order store version and rejected drops. Checking the store
+    # ingests any new order drops; the manifest is kept for the builders to read from.
+    fingerprint = {path: source_version(path) for path in dict.fromkeys(dataset_source(name) for name in DATASETS)}
+    manifest = refresh_order_store()
+    fingerprint['orders'] = (manifest['base'], manifest['sequence'])
+    fingerprint['rejected_drops'] = tuple(sorted(manifest['rejected'].items()))
+    fingerprint['manifest'] = manifest
+    return fingerprint
+
+
+def _nbytes(obj):
+    if hasattr(obj, 'memory_usage'):
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, 'nbytes'):
+        return int(obj.nbytes)
+    if hasattr(obj, 'tables'):
+        return sum(_nbytes(table) for table in obj.tables.values() if table is not None)
+    return 0
+
+
+class Snapshot:
+    """A numbered, read-only set of frames, each built on first access and then memoized.
+
+    Entries whose inputs did not move since `previous` are carried over from it when it
+    had built them. Callers must not modify what they get back.
+    """
+
+    def __init__(self, version, fingerprint, previous=None):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.data = {}
+        self.sizes = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        if previous is not None:
+            for name, obj in list(previous.data.items()):
+                if self._unchanged(name, previous):
+                    self.sizes[name] = previous.sizes[name]
+                    self.data[name] = obj
+
+    def _unchanged(self, name, previous):
+        keys, _ = ENTRIES[name]
+        return all(previous.fingerprint.get(key) == self.fingerprint.get(key) for key in keys)
+
+    def __getitem__(self, name):
+        record_hit(name, name in self.data)
+        if name in self.data:
+            return self.data[name]
+        _, build = ENTRIES[name]
+        # One lock per builder: concurrent sessions wait for a single build instead of repeating it
+        with self._lock:
+            lock = self._locks.setdefault(build, threading.Lock())
+        with lock:
+            if name not in self.data:
+                for built, obj in build(self).items():
+                    self.sizes[built] = _nbytes(obj)
+                    self.data[built] = obj
+        return self.data[name]
+
+    def built(self):
+        return list(self.data)
+
+    def content_version(self):
+        # The source and order store versions, unlike `version` stable across restarts; a
+        # key for anything kept outside the process (files on disk)
+        return tuple(sorted((key, value) for key, value in self.fingerprint.items()
+                            if key not in ('manifest', 'rejected_drops')))
+
+
+def build_snapshot(version, fingerprint, previous=None):
+    """The next Snapshot. Entries `previous` had built are ready before it is published:
+    unchanged ones are carried over, the others rebuilt. The rest wait until asked for."""
+    snapshot = Snapshot(version, fingerprint, previous)
+    for name in previous.built() if previous is not None else ():
+        snapshot[name]
+    return snapshot
+
+
+class SnapshotStore:
+    """Process-wide holder of the current Snapshot and the versions sessions may still be on.
+
+    Readers never wait on a refresh: `current()` returns whatever version is published,
+    and a new version is only published (a single reference swap) once the entries in use
+    are rebuilt. The first version holds nothing yet, so publishing it is cheap.
+    """
+
+    def __init__(self, build=build_snapshot, fingerprint=snapshot_fingerprint, interval=REFRESH_INTERVAL,
+                 budget=MEMORY_BUDGET):
+        self.build, self.fingerprint = build, fingerprint
+        self.interval, self.budget = interval, budget
+        self.last_error = None
+        self._current = None
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        if self._current is None:
+            with self._refresh_lock:
+                if self._current is None:
+                    self._refresh(raise_errors=True)
+        return self._current
+
+    def get(self, version):
+        # The requested version if it is still retained, otherwise the current one
+        snapshot = self._versions.get(version)
+        return snapshot if snapshot is not None else self.current()
+
+    def refresh(self):
+        """Build and publish a new version if the sources moved; no-op if a refresh is already running."""
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._refresh_lock.release()
+        return self._current
+
+    def _refresh(self, raise_errors=False):
+        previous = self._current
+        try:
+            fingerprint = self.fingerprint()
+            if previous is not None and fingerprint == previous.fingerprint:
+                return
+            version = previous.version + 1 if previous is not None else 1
+            snapshot = self.build(version, fingerprint, previous)
+        except Exception as e:
+            # Keep serving the last good version; the error is surfaced to admins
+            self.last_error = e
+            if raise_errors:
+                raise
+            return
+        self.last_error = None
+        with self._lock:
+            self._versions[snapshot.version] = snapshot
+            self._current = snapshot
+            self._evict()
+
+    def _evict(self):
+        # Oldest first; the current version is always kept, even over budget
+        while len(self._versions) > 1 and self.retained_bytes() > self.budget:
+            self._versions.popitem(last=False)
+
+    def retained_bytes(self):
+        # Objects reused between versions are counted once
+        unique = {}
+        for snapshot in list(self._versions.values()):
+            for name, obj in list(snapshot.data.items()):
+                unique[id(obj)] = snapshot.sizes[name]
+        return sum(unique.values())
+
+    def versions(self):
+        return list(self._versions)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Each refresh that builds a version is logged like a page render
+        while not self._stop.wait(self.interval):
+            start_render('(snapshot refresh)')
+            self.refresh()
+            finish_render(log_empty=False)
@@ -0,0 +1,193 @@
+"""Synthetic data shaped like the mock files, at any scale, for benchmarks and load tests.
+
+    python synthetic.py --rows 1M --out synthetic/1M           # Parquet + CSV
+    python synthetic.py --rows 10k --out synthetic/10k --excel # also the mock file names, for the app
+
+Orders are drawn per customer with a skewed order count; a share of customers stop ordering
+part-way through the history so the phase, coverage and leakage outputs all have content.
+The derived files (action list, coverage sheet, leakage CSVs) come from the same engines the
+dashboard uses, so their schemas match the mock files exactly.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import (CANONICAL_FILE, COVERAGE_FILE, COVERAGE_SHEET, LEAKAGE_FILE, NEXT_CALL_FILE, STRATEGY_FILE,
+                         compact)
+from engines import (LEAKAGE_COLUMNS, classify_coverage, detect_leakage, next_best_calls, priority_labels,
+                     roi_speed_scores)
+
+SIZES = {'10k': 10_000, '1M': 1_000_000, '10M': 10_000_000}
+CATEGORIES = ['Electrical', 'Hardware', 'Plumbing', 'Safety', 'Tools']
+EXCEL_MAX_ROWS = 1_048_575
+STALLED_DAYS = 90  # no order for this long moves a covered account to Phase 1B
+DORMANT_DAYS = 180
+
+# recommended_phase -> (account_status, recommended_action), as in Account_Action_List
+PHASE_ACTIONS = {
+    'Phase 1A': ('No Coverage', 'Assign Rep'),
+    'Phase 1B': ('Declining', 'Call / Re-engage'),
+    'Phase 2': ('Active', 'Deepen Penetration'),
+    'Phase 3': ('Active', 'Monitor'),
+}
+
+
+def parse_rows(text):
+    # "10k", "1M", "10M" or a plain number
+    text = str(text).strip()
+    if text in SIZES:
+        return SIZES[text]
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1].lower(), 1)
+    return int(float(text.rstrip('kKmM')) * multiplier)
+
+
+def _labels(prefix, count, start=1):
+    width = max(3, len(str(count + start - 1)))
+    return [f"{prefix}_{i:0{width}d}" for i in range(start, start + count)]
+
+
+def generate_orders(rows, seed=0, start='2024-01-01', days=730):
+    """`rows` order lines in the canonical_dataset.xlsx schema, grouped by customer."""
+    rng = np.random.default_rng(seed)
+    n_customers = max(50, rows // 20)
+    n_reps = max(10, n_customers // 100)
+    n_skus = 50
+
+    # Customer attributes: skewed order volume, a rep (or none) and, for some, a stop date
+    weights = rng.pareto(1.5, n_customers) + 1
+    rep_codes = np.where(rng.random(n_customers) < 0.3, n_reps, rng.integers(0, n_reps, n_customers))
+    role_codes = np.append(rng.integers(0, 2, n_reps), -1)  # UNASSIGNED has no role
+    stops = np.where(rng.random(n_customers) < 0.3, rng.uniform(0.3, 0.85, n_customers), 1.0) * days
+
+    codes = np.sort(rng.choice(n_customers, size=rows, p=weights / weights.sum()))
+    offsets = (rng.random(rows) * stops[codes]).astype('int64')
+    skus = rng.integers(0, n_skus, rows)
+    sku_categories = rng.integers(0, len(CATEGORIES), n_skus)
+    values = np.clip(rng.lognormal(6.5, 0.9, rows), 100, 7500)
+
+    customers = _labels('CUST', n_customers)
+    rep_ids = _labels('REP', n_reps, start=1) + ['UNASSIGNED']
+    orders = pd.DataFrame({
+        'customer_id': pd.Categorical.from_codes(codes, customers),
+        'account_name': pd.Categorical.from_codes(codes, [f"Account {c[5:]} Enterprises" for c in customers]),
+        'order_id': 'ORD_' + pd.Series(np.arange(10001, 10001 + rows)).astype(str),
+        'order_date': pd.Timestamp(start) + pd.to_timedelta(offsets, unit='D'),
+        'order_value': values,
+        'sku': pd.Categorical.from_codes(skus, _labels('SKU', n_skus, start=1)),
+        'category': pd.Categorical.from_codes(sku_categories[skus], CATEGORIES),
+        'rep_id': pd.Categorical.from_codes(rep_codes[codes], rep_ids),
+        'rep_role': pd.Categorical.from_codes(role_codes[rep_codes[codes]], ['Inside', 'Outside']),
+        'margin': (values * rng.uniform(0.1, 0.3, rows)).astype('float32'),
+    })
+    return orders
+
+
+def derive_actions(orders):
+    """Account_Action_List rows for every customer with orders, best ROI first."""
+    per_customer = orders.groupby('customer_id', observed=True).agg(
+        account_name=('account_name', 'first'), assigned_rep=('rep_id', 'first'),
+        ltv=('order_value', 'sum'), last_order=('order_date', 'max'))
+    days_since = (orders['order_date'].max() - per_customer['last_order']).dt.days.to_numpy()
+    no_rep = (per_customer['assigned_rep'] == 'UNASSIGNED').to_numpy()
+    ltv = per_customer['ltv'].to_numpy()
+    stalled = days_since > STALLED_DAYS
+    covered_active = ~no_rep & ~stalled
+    high_value = ltv >= (np.quantile(ltv[covered_active], 0.65) if covered_active.any() else np.inf)
+
+    phase = np.select([no_rep, stalled, high_value], ['Phase 1A', 'Phase 1B', 'Phase 2'], default='Phase 3')
+    status = np.array([PHASE_ACTIONS[p][0] for p in phase], dtype=object)
+    status[(phase == 'Phase 1B') & (days_since > DORMANT_DAYS)] = 'Dormant'
+    reason = np.where(phase == 'Phase 1A', [f"Active with ${v:.0f} revenue but no rep." for v in ltv],
+                      np.where(phase == 'Phase 1B', [f"Revenue stalled ({d} days ago)." for d in days_since],
+                               "Consistent active account."))
+
+    actions = pd.DataFrame({
+        'customer_id': per_customer.index.astype(str),
+        'account_name': per_customer['account_name'].astype(str).to_numpy(),
+        'account_status': status,
+        'recommended_phase': phase,
+        'roi_speed_score': 0,
+        'priority_label': '',
+        'recommended_action': [PHASE_ACTIONS[p][1] for p in phase],
+        'primary_reason': reason,
+        'assigned_rep': per_customer['assigned_rep'].astype(str).to_numpy(),
+    })
+    scores = roi_speed_scores(orders, phases=actions.set_index('customer_id')['recommended_phase'])
+    actions['roi_speed_score'] = scores['roi_speed_score'].to_numpy()
+    actions['priority_label'] = priority_labels(actions['roi_speed_score'])
+    actions = actions.sort_values('roi_speed_score', ascending=False, kind='stable', ignore_index=True)
+    return actions, per_customer['ltv']
+
+
+def generate(rows, seed=0):
+    """Every synthetic source, keyed like data_loader.DATASETS ('orders' for the canonical history)."""
+    orders = generate_orders(rows, seed)
+    actions, ltv = derive_actions(orders)
+    assignments = orders[['customer_id', 'rep_role']].drop_duplicates('customer_id').astype({'customer_id': str})
+    leakage = detect_leakage([orders[list(LEAKAGE_COLUMNS)]])
+
+    summary = (actions.assign(total_revenue=actions['customer_id'].map(ltv.set_axis(ltv.index.astype(str))))
+               .groupby('recommended_phase')
+               .agg(customer_id=('customer_id', 'count'), total_revenue=('total_revenue', 'sum'),
+                    roi_speed_score=('roi_speed_score', 'mean'))
+               .reset_index())
+    targets = int(actions['recommended_phase'].isin(['Phase 1A', 'Phase 1B']).sum())
+    overview = pd.DataFrame({'Metric': ['Total Accounts', 'Total Revenue', 'Phase 1A + 1B Combined Opportunity'],
+                             'Value': [str(len(actions)), f"${orders['order_value'].sum():,.0f}", f"{targets} accounts"]})
+    return {
+        'orders': orders,
+        'overview': overview,
+        'actions': actions,
+        'summary': summary,
+        'coverage': classify_coverage(actions, assignments),
+        'leakage': leakage,
+        'next_call': next_best_calls(leakage),
+    }
+
+
+def write_dataset(data, out_dir, excel=False):
+    """Write `data` under `out_dir`: Parquet/CSV always, plus the mock file names with `excel`.
+
+    The Excel copies let the dashboard run against the synthetic data (`cd out_dir` and
+    start the app from there); they are limited to Excel's row count.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    compact(data['orders']).to_parquet(os.path.join(out_dir, 'canonical_dataset.parquet'), index=False)
+    for name in ('actions', 'coverage'):
+        data[name].to_parquet(os.path.join(out_dir, f"{name}.parquet"), index=False)
+    data['leakage'].to_csv(os.path.join(out_dir, LEAKAGE_FILE), index=False)
+    data['next_call'].to_csv(os.path.join(out_dir, NEXT_CALL_FILE), index=False)
+    if not excel:
+        return
+
+    if len(data['orders']) > EXCEL_MAX_ROWS:
+        raise ValueError(f"{len(data['orders']):,} orders do not fit in one Excel sheet ({EXCEL_MAX_ROWS:,} rows)")
+    data['orders'].to_excel(os.path.join(out_dir, CANONICAL_FILE), index=False)
+    data['coverage'].to_excel(os.path.join(out_dir, COVERAGE_FILE), sheet_name=COVERAGE_SHEET, index=False)
+    logic = pd.read_excel(STRATEGY_FILE, sheet_name='ROI_Logic_Explained')
+    with pd.ExcelWriter(os.path.join(out_dir, STRATEGY_FILE)) as writer:
+        data['overview'].to_excel(writer, sheet_name='Executive_Overview', index=False)
+        data['actions'].to_excel(writer, sheet_name='Account_Action_List', index=False)
+        logic.to_excel(writer, sheet_name='ROI_Logic_Explained', index=False)
+        data['summary'].to_excel(writer, sheet_name='Phase_Summary', index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic dashboard data.")
+    parser.add_argument('--rows', default='10k', help="order lines: 10k, 1M, 10M or a number (default: 10k)")
+    parser.add_argument('--out', default=None, help="output directory (default: synthetic/<rows>)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--excel', action='store_true', help="also write the mock workbook/file names for the app")
+    args = parser.parse_args(argv)
+
+    rows = parse_rows(args.rows)
+    out_dir = args.out or os.path.join('synthetic', args.rows)
+    data = generate(rows, args.seed)
+    write_dataset(data, out_dir, excel=args.excel)
+    print(f"{out_dir}: {rows:,} orders, {len(data['actions']):,} accounts, {len(data['leakage']):,} leaking")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""Hot-path telemetry: per-render span timings, cache hits/misses and payload sizes.
+
+Each script run starts a render, phases of the page are timed with `span()`, and
+`finish_render()` folds the result into rolling p50/p95 windows and writes one JSON line
+to LOG_PATH. Summarize the log over time with
+
+    python telemetry.py --freq h        # p50/p95 per page and phase, per hour
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- HOT-PATH TELEMETRY ---
+# Phases a render's time is split into; time outside any span is reported as 'other'
+PHASES = ('snapshot', 'excel_parse', 'load', 'aggregate', 'figure_build', 'chart_serialize', 'table_serialize')
+WINDOW = 500  # most recent renders per page/phase kept for the live percentiles
+# Same git-ignored directory as data_loader.CACHE_DIR; rotated so it never grows unbounded
+LOG_PATH = os.path.join('.cache', 'telemetry.jsonl')
+LOG_MAX_BYTES = 10 << 20
+LOG_BACKUPS = 3
+
+logger = logging.getLogger('productzero.telemetry')
+
+_local = threading.local()
+_lock = threading.Lock()
+_durations = defaultdict(lambda: deque(maxlen=WINDOW))  # (page, phase) -> seconds, newest last
+_cache_counts = defaultdict(Counter)  # loader -> {'hits': n, 'misses': n} since process start
+
+
+class Render:
+    """Timings, cache events and payload sizes of one script run.
+
+    Span times are exclusive: a span nested in another (an Excel parse inside the first
+    snapshot build) is taken out of its parent, so the phases add up to the render. Spans
+    from pool threads (see `in_render`) are summed across threads and taken out of the span
+    that waited on them, so with parallel work they can add up to more than the render.
+    """
+
+    def __init__(self, page, session=None):
+        self.page, self.session = page, session
+        self.started = time.perf_counter()
+        self.spans = defaultdict(float)
+        self.cache = defaultdict(Counter)
+        self.payloads = []
+        self._children = []
+
+    @contextmanager
+    def span(self, phase):
+        self._children.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.spans[phase] += max(elapsed - self._children.pop(), 0.0)
+            if self._children:
+                self._children[-1] += elapsed
+
+    def merge(self, other):
+        with _lock:
+            for phase, seconds in other.spans.items():
+                self.spans[phase] += seconds
+            for loader, counts in other.cache.items():
+                self.cache[loader].update(counts)
+            self.payloads.extend(other.payloads)
+            if self._children:
+                self._children[-1] += sum(other.spans.values())
+
+
+def start_render(page, session=None):
+    # Replaces whatever render this thread had open (a run cut short by st.stop/st.rerun)
+    _local.render = Render(page, session)
+    return _local.render
+
+
+def current_render():
+    return getattr(_local, 'render', None)
+
+
+def in_render(fn, render=None):
+    """Wrap `fn` for a worker thread so its spans count towards `render` (default: the caller's)."""
+    render = render or current_render()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        if render is None:
+            return fn(*args, **kwargs)
+        _local.render = worker = Render(render.page, render.session)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.render = None
+            render.merge(worker)
+    return run
+
+
+@contextmanager
+def span(phase):
+    """Time the block as `phase` of this thread's render; a no-op outside a render."""
+    render = current_render()
+    if render is None:
+        yield
+        return
+    with render.span(phase):
+        yield
+
+
+def record_miss(loader):
+    # Called first thing in a cached function's body, which only runs on a miss
+    misses = getattr(_local, 'misses', None)
+    if misses is None:
+        misses = _local.misses = Counter()
+    misses[loader] += 1
+
+
+def _record_cache(loader, outcome):
+    with _lock:
+        _cache_counts[loader][outcome] += 1
+    render = current_render()
+    if render is not None:
+        render.cache[loader][outcome] += 1
+
+
+def tracked(loader):
+    """Count hits and misses of a cached function whose body calls record_miss(loader)."""
+    def decorate(cached):
+        @functools.wraps(cached)
+        def call(*args, **kwargs):
+            misses = getattr(_local, 'misses', Counter())[loader]
+            result = cached(*args, **kwargs)
+            missed = getattr(_local, 'misses', Counter())[loader] > misses
+            _record_cache(loader, 'misses' if missed else 'hits')
+            return result
+        return call
+    return decorate
+
+
+def record_hit(loader, hit):
+    # For caches that know the outcome up front (e.g. the Parquet copies of the Excel files)
+    _record_cache(loader, 'hits' if hit else 'misses')
+
+
+def record_payload(kind, name, nbytes):
+    render = current_render()
+    if render is not None:
+        render.payloads.append({'kind': kind, 'name': name, 'bytes': int(nbytes)})
+
+
+def table_payload_bytes(df):
+    # Size of the Arrow IPC stream st.dataframe sends for `df`, counted without buffering it.
+    # Streamlit ships columns Arrow cannot type as strings, so those are measured that way.
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        table = pa.Table.from_pandas(df.astype(str))
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.size()
+
+
+def _log():
+    # File handler attached on first use; an unwritable log directory only disables the file
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+            handler = RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        except OSError:
+            handler = logging.NullHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+
+def finish_render(log_empty=True):
+    """Close this thread's render, add it to the percentile windows and log it as JSON.
+
+    Returns the logged record, or None when there was no render (or, with `log_empty`
+    off, nothing was timed in it).
+    """
+    render = current_render()
+    _local.render = None
+    if render is None or (not log_empty and not render.spans):
+        return None
+    total = time.perf_counter() - render.started
+    spans = dict(render.spans, other=max(total - sum(render.spans.values()), 0.0), total=total)
+    with _lock:
+        for phase, seconds in spans.items():
+            _durations[(render.page, phase)].append(seconds)
+
+    record = {
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'page': render.page,
+        'session': render.session,
+        'spans_ms': {phase: round(seconds * 1000, 2) for phase, seconds in spans.items()},
+        'cache': {loader: dict(counts) for loader, counts in render.cache.items()},
+        'payloads': render.payloads,
+    }
+    _log().info(json.dumps(record))
+    return record
+
+
+def _phase_order(key):
+    page, phase = key
+    order = PHASES + ('other', 'total')
+    return page, order.index(phase) if phase in order else len(order), phase
+
+
+def _percentile_rows(groups):
+    groups = sorted(groups, key=lambda group: _phase_order(group[0]))
+    return [{'page': page, 'phase': phase, 'renders': len(values),
+             'p50_ms': round(float(np.percentile(values, 50)) * 1000, 1),
+             'p95_ms': round(float(np.percentile(values, 95)) * 1000, 1),
+             'max_ms': round(float(np.max(values)) * 1000, 1)}
+            for (page, phase), values in groups]
+
+
+def percentiles():
+    """p50/p95/max per page and phase over the last WINDOW renders in this process."""
+    with _lock:
+        groups = [(key, list(values)) for key, values in _durations.items() if values]
+    return pd.DataFrame(_percentile_rows(groups),
+                        columns=['page', 'phase', 'renders', 'p50_ms', 'p95_ms', 'max_ms'])
+
+
+def cache_stats():
+    # Hit/miss counts per loader since the process started
+    with _lock:
+        rows = [{'loader': loader, 'hits': counts['hits'], 'misses': counts['misses']}
+                for loader, counts in sorted(_cache_counts.items())]
+    stats = pd.DataFrame(rows, columns=['loader', 'hits', 'misses'])
+    stats['hit_rate'] = (stats['hits'] / (stats['hits'] + stats['misses'])).round(3)
+    return stats
+
+
+def read_log(path=LOG_PATH):
+    """Every logged render, oldest first, from `path` and its rotated backups."""
+    paths = [f"{path}.{i}" for i in range(LOG_BACKUPS, 0, -1)] + [path]
+    records = []
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path) as fh:
+            records.extend(json.loads(line) for line in fh if line.strip())
+    return records
+
+
+def summarize(records, freq='D'):
+    """p50/p95 per period (a pandas offset alias), page and phase, for tracking over time."""
+    rows = [{'ts': record['ts'], 'page': record['page'], 'phase': phase, 'seconds': ms / 1000}
+            for record in records for phase, ms in record['spans_ms'].items()]
+    if not rows:
+        return pd.DataFrame(columns=['period', 'page', 'phase', 'renders', 'p50_ms', 'p95_ms', 'max_ms'])
+    df = pd.DataFrame(rows)
+    df['period'] = pd.to_datetime(df['ts']).dt.tz_localize(None).dt.to_period(freq)
+    summary = []
+    for period, group in df.groupby('period', sort=True):
+        grouped = group.groupby(['page', 'phase'], sort=True)['seconds']
+        summary.extend({'period': str(period), **row}
+                       for row in _percentile_rows((key, values.to_numpy()) for key, values in grouped))
+    return pd.DataFrame(summary)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the dashboard's render telemetry log.")
+    parser.add_argument('--log', default=LOG_PATH)
+    parser.add_argument('--freq', default='D', help="period to group by, as a pandas alias (default: D)")
+    parser.add_argument('--phase', default='total', help="phase to show, or 'all' (default: total)")
+    args = parser.parse_args(argv)
+
+    summary = summarize(read_log(args.log), args.freq)
+    if args.phase != 'all':
+        summary = summary[summary['phase'] == args.phase]
+    if summary.empty:
+        print(f"No renders logged in {args.log}")
+        return
+    print(summary.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
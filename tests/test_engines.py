@@ -0,0 +1,150 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch import sharded_leakage
+from data_loader import read_orders, refresh_order_store
+from engines import (COVERAGE_FLAGS, LEAKAGE_COLUMNS, classify_coverage, detect_leakage, roi_scores_from_totals,
+                     roi_speed_scores)
+
+ORDERS = pd.DataFrame({
+    'customer_id': ['CUST_A', 'CUST_A', 'CUST_B', 'CUST_C'],
+    'order_date': pd.to_datetime(['2024-06-01', '2024-06-20', '2024-01-10', '2024-05-01']),
+    'order_value': [100.0, 100.0, 500.0, 50.0],
+    'rep_role': ['Inside', 'Inside', None, 'Outside'],
+})
+PHASES = pd.Series({'CUST_A': 'Phase 1A', 'CUST_B': 'Phase 2', 'CUST_C': 'Phase 3'})
+
+
+def scores(frame):
+    return frame.set_index('customer_id')['roi_speed_score'].to_dict()
+
+
+def test_roi_speed_scores_by_hand():
+    # Recent (90 days to 2024-06-20) 2/0/1 orders and lifetime 200/500/50 rank to percentiles
+    # A 100/67, B 0/100, C 67/33; the coverage bonus goes to B (no rep) or to A (Phase 1A)
+    assert scores(roi_speed_scores(ORDERS)) == {'CUST_A': 67, 'CUST_B': 60, 'CUST_C': 40}
+    assert scores(roi_speed_scores(ORDERS, phases=PHASES)) == {'CUST_A': 87, 'CUST_B': 40, 'CUST_C': 40}
+
+
+def test_roi_scores_from_totals_by_hand():
+    ltv = pd.Series({'CUST_C': 50.0, 'CUST_A': 200.0, 'CUST_B': 500.0})
+    recent = pd.Series({'CUST_A': 2, 'CUST_C': 1})
+    assert scores(roi_scores_from_totals(ltv, recent, PHASES)) == {'CUST_A': 87, 'CUST_B': 40, 'CUST_C': 40}
+
+
+def test_roi_scores_from_totals_matches_the_full_pass():
+    rng = np.random.default_rng(3)
+    n = 5_000
+    orders = pd.DataFrame({
+        'customer_id': rng.choice([f"CUST_{i:04d}" for i in range(400)], n),
+        'order_date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 540, n), unit='D'),
+        'order_value': rng.gamma(2.0, 300.0, n).round(2),
+        'rep_role': None,
+    })
+    phases = pd.Series(rng.choice(['Phase 1A', 'Phase 2', 'Phase 3'], 400), index=[f"CUST_{i:04d}" for i in range(400)])
+    cutoff = orders['order_date'].max() - pd.Timedelta(days=90)
+
+    ltv = orders.groupby('customer_id')['order_value'].sum()
+    recent = orders.loc[orders['order_date'] > cutoff, 'customer_id'].value_counts()
+    incremental = roi_scores_from_totals(ltv, recent, phases)
+    full = roi_speed_scores(orders, phases=phases)
+    pd.testing.assert_frame_equal(incremental, full, check_dtype=False)
+
+
+def monthly_orders(customer_id, months, per_month=1, value=50.0):
+    rows = [{'customer_id': customer_id, 'account_name': customer_id.title(), 'order_date': month.to_timestamp(),
+             'order_value': value} for month in months for _ in range(per_month)]
+    return pd.DataFrame(rows)
+
+
+def test_short_history_is_audited_over_the_months_it_has():
+    # 14 months of history: the 3-month current window leaves 11 baseline months, not 12
+    steady = monthly_orders('CUST_STEADY', pd.period_range('2023-01', '2024-02', freq='M'))
+    lapsed = monthly_orders('CUST_LAPSED', pd.period_range('2023-01', '2023-11', freq='M'), per_month=2)
+    leakage = detect_leakage([pd.concat([steady, lapsed])], as_of='2024-03')
+
+    assert leakage['customer_id'].tolist() == ['CUST_LAPSED']
+    assert leakage.loc[0, 'reason'] == '100% drop in order frequency'
+    assert leakage.loc[0, 'est_recoverable_revenue'] == 100.0 * 12  # 2 orders x 50 a month
+
+
+# 2023-01..2024-03 with the audit run as of April 2024: the baseline is 2023, the current
+# window January to March 2024, and April itself is not looked at
+AUDIT_MONTHS = pd.period_range('2023-01', '2024-03', freq='M')
+
+
+def audit_orders():
+    baseline, current = AUDIT_MONTHS[:12], AUDIT_MONTHS[12:]
+    return pd.concat([
+        monthly_orders('CUST_DROP25', baseline, per_month=4, value=10.0),
+        monthly_orders('CUST_DROP25', current, per_month=3, value=10.0),
+        monthly_orders('CUST_DROP20', baseline, per_month=5, value=10.0),
+        monthly_orders('CUST_DROP20', current, per_month=4, value=10.0),
+        monthly_orders('CUST_ASOF', baseline),
+        monthly_orders('CUST_ASOF', pd.period_range('2024-04', periods=1, freq='M'), per_month=5),
+    ], ignore_index=True)
+
+
+def test_leakage_windows_and_threshold():
+    leakage = detect_leakage([audit_orders()], as_of='2024-04-15').set_index('customer_id')
+    assert sorted(leakage.index) == ['CUST_ASOF', 'CUST_DROP25']
+    assert leakage.loc['CUST_DROP25', 'reason'] == '25% drop in order frequency'
+    assert leakage.loc['CUST_DROP25', 'est_recoverable_revenue'] == (40.0 - 30.0) * 12
+    assert leakage.loc['CUST_ASOF', 'reason'] == '100% drop in order frequency'
+
+    looser = detect_leakage([audit_orders()], as_of='2024-04-15', threshold=0.2)
+    assert sorted(looser['customer_id']) == ['CUST_ASOF', 'CUST_DROP20', 'CUST_DROP25']
+
+
+def test_coverage_rules_first_match_wins():
+    actions = pd.DataFrame([
+        ('NOREP_1A', 'Phase 1A', 10),
+        ('NOREP_HIGH', 'Phase 3', 80),     # no rep beats the Phase 3 over-service rule
+        ('NOREP_MID', 'Phase 2', 50),
+        ('UNASSIGNED', 'Phase 2', 71),     # missing from the assignments counts as no rep
+        ('INSIDE_HIGH', 'Phase 1A', 80),
+        ('INSIDE_70', 'Phase 2', 70),      # thresholds are strict
+        ('OUTSIDE_P3', 'Phase 3', 90),
+        ('OUTSIDE_LOW', 'Phase 2', 20),
+        ('OUTSIDE_1A', 'Phase 1A', 80),
+    ], columns=['customer_id', 'recommended_phase', 'roi_speed_score'])
+    assignments = pd.DataFrame({
+        'customer_id': ['NOREP_1A', 'NOREP_HIGH', 'NOREP_MID', 'INSIDE_HIGH', 'INSIDE_70', 'OUTSIDE_P3',
+                        'OUTSIDE_LOW', 'OUTSIDE_1A'],
+        'rep_role': [None, None, None, 'Inside', 'Inside', 'Outside', 'Outside', 'Outside'],
+    })
+    flags = classify_coverage(actions, assignments).set_index('customer_id')['coverage_flag'].to_dict()
+    assert flags == {
+        'NOREP_1A': COVERAGE_FLAGS['critical_gap'],
+        'NOREP_HIGH': COVERAGE_FLAGS['critical_gap'],
+        'NOREP_MID': COVERAGE_FLAGS['aligned'],
+        'UNASSIGNED': COVERAGE_FLAGS['critical_gap'],
+        'INSIDE_HIGH': COVERAGE_FLAGS['under_serviced'],
+        'INSIDE_70': COVERAGE_FLAGS['aligned'],
+        'OUTSIDE_P3': COVERAGE_FLAGS['over_serviced'],
+        'OUTSIDE_LOW': COVERAGE_FLAGS['over_serviced'],
+        'OUTSIDE_1A': COVERAGE_FLAGS['aligned'],
+    }
+
+
+@pytest.mark.parametrize('workers, shards', [(1, 1), (1, 4), (2, 3)])
+def test_sharded_leakage_matches_a_single_pass(tmp_path, monkeypatch, workers, shards):
+    monkeypatch.chdir(tmp_path)
+    orders = audit_orders()
+    orders = orders.assign(order_id=[f"ORD_{i:05d}" for i in range(len(orders))], sku='SKU_1', category='Tools',
+                           rep_id='REP_1', rep_role='Inside', margin=0.2)
+    orders.to_excel('canonical.xlsx', index=False)
+    # A late drop lands in months the seed partitions already cover, so folds must be summed
+    os.makedirs('order_drops')
+    late = monthly_orders('CUST_DROP20', AUDIT_MONTHS[12:], per_month=1, value=10.0)
+    late.assign(order_id=[f"LATE_{i}" for i in range(len(late))], sku='SKU_1', category='Tools', rep_id='REP_1',
+                rep_role='Inside', margin=0.2).to_csv(os.path.join('order_drops', 'late.csv'), index=False)
+    manifest = refresh_order_store('canonical.xlsx')
+
+    single = detect_leakage([read_orders(manifest, LEAKAGE_COLUMNS)], as_of='2024-04-15')
+    sharded = sharded_leakage(manifest, as_of='2024-04-15', workers=workers, shards=shards)
+    assert sorted(single['customer_id']) == ['CUST_ASOF', 'CUST_DROP25']  # DROP20 is back to 5 a month
+    pd.testing.assert_frame_equal(sharded, single, check_dtype=False)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from indexes import PhaseIndex
+
+rng = np.random.default_rng(7)
+N = 2_000
+ACTIONS = pd.DataFrame({
+    'customer_id': [f"CUST_{i:05d}" for i in range(N)],
+    'recommended_phase': rng.choice(['Phase 1A', 'Phase 1B', 'Phase 2', 'Phase 3'], N),
+    'roi_speed_score': rng.integers(0, 100, N),
+})
+
+
+def order(index):
+    return {phase: index.phase(phase)['customer_id'].tolist() for phase in index.phases()}
+
+
+@pytest.mark.parametrize('changed', [10, N])
+def test_with_actions_matches_a_fresh_build_and_leaves_the_original(changed):
+    index = PhaseIndex(ACTIONS, version=1)
+    before = order(index)
+
+    rescored = ACTIONS.copy()
+    rows = rng.choice(N, changed, replace=False)
+    rescored.loc[rows, 'roi_speed_score'] = rng.integers(0, 100, changed)
+    derived = index.with_actions(rescored, version=2)
+
+    assert derived.version == 2 and index.version == 1
+    assert order(derived) == order(PhaseIndex(rescored))
+    assert derived.top(10)['customer_id'].tolist() == PhaseIndex(rescored).top(10)['customer_id'].tolist()
+    assert order(index) == before
+
+
+def test_with_actions_rebuilds_when_phases_change():
+    moved = ACTIONS.assign(recommended_phase='Phase 2')
+    derived = PhaseIndex(ACTIONS).with_actions(moved)
+    assert derived.phases() == ['Phase 2']
+    assert len(derived.phase('Phase 2')) == N
@@ -0,0 +1,108 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_loader import load_canonical, refresh_order_store, store_files
+from rollups import ROLLUP_COLUMNS, RollupCube
+
+BASE = pd.DataFrame({
+    'customer_id': ['CUST_001', 'CUST_002', 'CUST_001'],
+    'account_name': ['Acme', 'Globex', 'Acme'],
+    'order_id': ['ORD_001', 'ORD_002', 'ORD_003'],
+    'order_date': pd.to_datetime(['2024-01-05', '2024-01-20', '2024-02-03']),
+    'order_value': [100.0, 250.0, 75.5],
+    'sku': ['SKU_1', 'SKU_2', 'SKU_1'],
+    'category': ['Tools', 'Parts', 'Tools'],
+    'rep_id': ['REP_1', None, 'REP_1'],
+    'rep_role': ['Inside', None, 'Inside'],
+    'margin': [0.2, 0.35, 0.1],
+})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # The columnar cache lives under the working directory, so each test gets its own
+    monkeypatch.chdir(tmp_path)
+    BASE.to_excel('canonical.xlsx', index=False)
+    os.makedirs('drops')
+
+    def refresh():
+        return refresh_order_store('canonical.xlsx', 'drops', os.path.join('.cache', 'orders'))
+    return refresh
+
+
+def write_drop(name, rows):
+    pd.DataFrame(rows).to_csv(os.path.join('drops', name), index=False)
+
+
+def order(order_id, **fields):
+    row = BASE.iloc[0].to_dict()
+    row.update({'order_id': order_id, 'order_date': '2024-03-01', **fields})
+    return row
+
+
+def stored_orders(manifest):
+    return pd.concat(pd.read_parquet(f) for f in store_files(manifest))
+
+
+def test_duplicate_orders_are_not_appended(store):
+    store()
+    write_drop('dup.csv', [order('ORD_001', order_date='2024-01-05'), order('ORD_004'), order('ORD_004')])
+    manifest = store()
+
+    assert manifest['order_count'] == 4
+    assert manifest['rejected'] == {}
+    assert sorted(stored_orders(manifest)['order_id']) == ['ORD_001', 'ORD_002', 'ORD_003', 'ORD_004']
+
+
+def test_new_keys_are_appended(store):
+    store()
+    write_drop('new.csv', [order('ORD_010', customer_id='CUST_0042', account_name='Initech', category='Safety')])
+    manifest = store()
+
+    assert manifest['sequence'] == 1
+    assert manifest['watermark'] == pd.Timestamp('2024-03-01').isoformat()
+    added = stored_orders(manifest).set_index('order_id').loc['ORD_010']
+    assert (added['customer_id'], added['account_name'], added['category']) == ('CUST_0042', 'Initech', 'Safety')
+
+
+def test_drop_missing_a_column_is_rejected(store):
+    store()
+    write_drop('no_margin.csv', [{k: v for k, v in order('ORD_011').items() if k != 'margin'}])
+    manifest = store()
+
+    assert manifest['order_count'] == 3
+    assert 'margin' in manifest['rejected']['no_margin.csv']
+
+
+@pytest.mark.parametrize('column', ['order_value', 'category', 'margin'])
+def test_drop_with_empty_values_is_rejected(store, column):
+    store()
+    write_drop('gaps.csv', [order('ORD_012'), order('ORD_013', **{column: None})])
+    manifest = store()
+
+    assert manifest['order_count'] == 3
+    assert column in manifest['rejected']['gaps.csv']
+
+
+def test_fixed_drop_is_ingested_and_rolls_up(store):
+    store()
+    write_drop('late.csv', [order('ORD_014', margin=None)])
+    assert 'late.csv' in store()['rejected']
+
+    write_drop('late.csv', [order('ORD_014', margin=0.3)])
+    manifest = store()
+    assert manifest['rejected'] == {}
+    cube = RollupCube.build(load_canonical(ROLLUP_COLUMNS, source='canonical.xlsx'))
+    assert cube.tables['margin_bins']['count'].sum() == 4
+
+
+def test_reseed_leaves_the_previous_generation_readable(store):
+    before = store()
+    BASE.assign(order_value=[110.0, 250.0, 75.5]).to_excel('canonical.xlsx', index=False)
+    after = store()
+
+    assert after['generation'] != before['generation']
+    assert stored_orders(before)['order_value'].sum() == 425.5
+    assert stored_orders(after)['order_value'].sum() == 435.5
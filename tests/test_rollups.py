@@ -0,0 +1,82 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_loader import refresh_order_store
+from rollups import refresh_activity, refresh_rollups
+
+ORDERS = pd.DataFrame({
+    'customer_id': ['CUST_001', 'CUST_002'],
+    'account_name': ['Acme', 'Globex'],
+    'order_id': ['ORD_001', 'ORD_002'],
+    'order_date': pd.to_datetime(['2024-01-05', '2024-02-20']),
+    'order_value': [100.0, 250.0],
+    'sku': ['SKU_1', 'SKU_2'],
+    'category': ['Tools', 'Parts'],
+    'rep_id': ['REP_1', 'REP_2'],
+    'rep_role': ['Inside', 'Outside'],
+    'margin': [0.2, 0.35],
+})
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def refresh(orders):
+    orders.to_excel('canonical.xlsx', index=False)
+    return refresh_rollups(refresh_order_store('canonical.xlsx'))
+
+
+def test_corrected_workbook_with_same_row_count_rebuilds(workdir):
+    assert refresh(ORDERS).category_revenue().set_index('category')['order_value'].to_dict() == {
+        'Tools': 100.0, 'Parts': 250.0}
+
+    corrected = ORDERS.assign(order_value=[120.0, 250.0])
+    cube = refresh(corrected)
+    assert cube.order_count == 2
+    assert cube.category_revenue().set_index('category')['order_value'].to_dict() == {'Tools': 120.0, 'Parts': 250.0}
+    assert len(os.listdir(os.path.join('.cache', 'rollups'))) == 2  # CURRENT.json and one version
+
+
+def test_unchanged_store_reuses_persisted_rollups(workdir):
+    first = refresh(ORDERS)
+    again = refresh_rollups(refresh_order_store('canonical.xlsx'))
+    assert again.base == first.base
+    assert again.monthly_revenue()['order_value'].sum() == 350.0
+
+
+def test_late_drop_is_folded_into_rollups_and_activity(workdir):
+    refresh(ORDERS)
+    refresh_activity(refresh_order_store('canonical.xlsx'))
+    os.makedirs('order_drops')
+    late = ORDERS.iloc[[0]].assign(order_id='ORD_003', order_date=pd.Timestamp('2024-01-10'), order_value=40.0)
+    late.to_csv(os.path.join('order_drops', 'late.csv'), index=False)
+
+    cube = refresh_rollups(refresh_order_store('canonical.xlsx'))
+    assert cube.order_count == 3 and cube.sequence == 1
+    assert cube.category_revenue().set_index('category')['order_value'].to_dict() == {'Tools': 140.0, 'Parts': 250.0}
+
+    activity = refresh_activity(refresh_order_store('canonical.xlsx'))
+    assert activity.sequence == 1
+    assert activity.ltv().to_dict() == {'CUST_001': 140.0, 'CUST_002': 250.0}
+    assert activity.totals.loc[('CUST_001', pd.Period('2024-01', 'M')), 'orders'] == 2
+
+
+def test_older_manifest_gets_its_own_build(workdir):
+    refresh(ORDERS)
+    before = refresh_order_store('canonical.xlsx')
+    os.makedirs('order_drops')
+    late = ORDERS.iloc[[1]].assign(order_id='ORD_004', order_value=50.0)
+    late.to_csv(os.path.join('order_drops', 'late.csv'), index=False)
+    after = refresh_order_store('canonical.xlsx')
+    refresh_rollups(after)
+    refresh_activity(after)
+
+    assert refresh_rollups(before).category_revenue().set_index('category')['order_value'].to_dict() == {
+        'Tools': 100.0, 'Parts': 250.0}
+    assert refresh_activity(before).ltv().to_dict() == {'CUST_001': 100.0, 'CUST_002': 250.0}
+    assert refresh_rollups(after).sequence == 1 and refresh_activity(after).sequence == 1